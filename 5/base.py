@@ -0,0 +1,808 @@
+import calendar
+import re
+import sqlite3
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date as Date, datetime
+from itertools import chain, groupby
+from operator import itemgetter
+
+PRIORITY_ORDER = {"Высокий": 1, "Средний": 2, "Низкий": 3}
+PRIORITY_NAMES = {rank: name for name, rank in PRIORITY_ORDER.items()}
+RECURRENCE_NAMES = {'daily': "Ежедневно", 'weekdays': "По будням", 'weekly': "Еженедельно", 'monthly': "Ежемесячно"}
+
+# Номер версии схемы = индекс миграции + 1, хранится в PRAGMA user_version
+MIGRATIONS = [
+    '''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        priority TEXT NOT NULL CHECK(priority IN ('Высокий', 'Средний', 'Низкий')),
+        duration INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS schedules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL UNIQUE,
+        schedule_text TEXT NOT NULL,
+        generated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    ''',
+    # Дата хранится номером дня (date.toordinal()), приоритет - рангом 1..3
+    '''
+    CREATE TABLE tasks_v2 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        priority INTEGER NOT NULL CHECK(priority IN (1, 2, 3)),
+        duration INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    -- Дата без ведущих нулей (2025-7-2) приводится к ГГГГ-ММ-ДД, приоритет принимается и со строчной буквы
+    -- (lower() в SQLite не работает с кириллицей); строки с неразборчивой датой или неизвестным
+    -- приоритетом не переносятся, а остаются в tasks_invalid для ручного исправления
+    CREATE TEMP TABLE task_values AS
+        SELECT id, CAST(julianday(printf('%04d-%02d-%02d',
+                                         substr(date, 1, instr(date, '-') - 1),
+                                         substr(rest, 1, instr(rest, '-') - 1),
+                                         substr(rest, instr(rest, '-') + 1))) - 1721424.5 AS INTEGER) AS day,
+               CASE trim(priority)
+                   WHEN 'Высокий' THEN 1 WHEN 'высокий' THEN 1
+                   WHEN 'Средний' THEN 2 WHEN 'средний' THEN 2
+                   WHEN 'Низкий' THEN 3 WHEN 'низкий' THEN 3
+               END AS rank
+        FROM (SELECT id, date, priority, substr(date, instr(date, '-') + 1) AS rest FROM tasks);
+    INSERT INTO tasks_v2 (id, name, priority, duration, day, created_at)
+        SELECT tasks.id, name, task_values.rank, duration, task_values.day, created_at
+        FROM tasks JOIN task_values ON task_values.id = tasks.id
+        WHERE task_values.day IS NOT NULL AND task_values.rank IS NOT NULL;
+    CREATE TABLE tasks_invalid AS
+        SELECT tasks.* FROM tasks JOIN task_values ON task_values.id = tasks.id
+        WHERE task_values.day IS NULL OR task_values.rank IS NULL;
+    DROP TABLE task_values;
+    UPDATE sqlite_sequence SET seq = (SELECT MAX(seq) FROM sqlite_sequence WHERE name IN ('tasks', 'tasks_v2'))
+        WHERE name = 'tasks_v2';
+    DROP TABLE tasks;
+    ALTER TABLE tasks_v2 RENAME TO tasks;
+    CREATE INDEX idx_tasks_day_priority ON tasks (day, priority);
+    ''',
+    # Постраничный вывод задач дня в порядке id без сортировки всех строк дня
+    '''
+    CREATE INDEX idx_tasks_day ON tasks (day);
+    ''',
+    # Итоги по дням поддерживаются триггерами; число задач каждого приоритета нужно,
+    # чтобы высший приоритет дня пересчитывался и после удаления задачи
+    '''
+    CREATE TABLE day_totals (
+        day INTEGER PRIMARY KEY,
+        task_count INTEGER NOT NULL,
+        total_duration INTEGER NOT NULL,
+        high_count INTEGER NOT NULL,
+        medium_count INTEGER NOT NULL,
+        low_count INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    INSERT INTO day_totals
+        SELECT day, COUNT(*), SUM(duration), SUM(priority = 1), SUM(priority = 2), SUM(priority = 3)
+        FROM tasks GROUP BY day;
+
+    CREATE TRIGGER tasks_totals_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO day_totals VALUES (NEW.day, 1, NEW.duration, NEW.priority = 1, NEW.priority = 2, NEW.priority = 3)
+        ON CONFLICT (day) DO UPDATE SET
+            task_count = task_count + 1,
+            total_duration = total_duration + excluded.total_duration,
+            high_count = high_count + excluded.high_count,
+            medium_count = medium_count + excluded.medium_count,
+            low_count = low_count + excluded.low_count;
+    END;
+
+    CREATE TRIGGER tasks_totals_delete AFTER DELETE ON tasks BEGIN
+        UPDATE day_totals SET
+            task_count = task_count - 1,
+            total_duration = total_duration - OLD.duration,
+            high_count = high_count - (OLD.priority = 1),
+            medium_count = medium_count - (OLD.priority = 2),
+            low_count = low_count - (OLD.priority = 3)
+        WHERE day = OLD.day;
+        DELETE FROM day_totals WHERE day = OLD.day AND task_count = 0;
+    END;
+
+    CREATE TRIGGER tasks_totals_update AFTER UPDATE OF day, priority, duration ON tasks BEGIN
+        UPDATE day_totals SET
+            task_count = task_count - 1,
+            total_duration = total_duration - OLD.duration,
+            high_count = high_count - (OLD.priority = 1),
+            medium_count = medium_count - (OLD.priority = 2),
+            low_count = low_count - (OLD.priority = 3)
+        WHERE day = OLD.day;
+        DELETE FROM day_totals WHERE day = OLD.day AND task_count = 0;
+        INSERT INTO day_totals VALUES (NEW.day, 1, NEW.duration, NEW.priority = 1, NEW.priority = 2, NEW.priority = 3)
+        ON CONFLICT (day) DO UPDATE SET
+            task_count = task_count + 1,
+            total_duration = total_duration + excluded.total_duration,
+            high_count = high_count + excluded.high_count,
+            medium_count = medium_count + excluded.medium_count,
+            low_count = low_count + excluded.low_count;
+    END;
+    ''',
+    # Ограничения для планировщика, минуты от начала суток; NULL - без ограничения
+    '''
+    ALTER TABLE tasks ADD COLUMN earliest INTEGER;
+    ALTER TABLE tasks ADD COLUMN deadline INTEGER;
+    ALTER TABLE tasks ADD COLUMN fixed_start INTEGER;
+    ''',
+    # Повторяющиеся задачи хранятся одним правилом и разворачиваются по датам при чтении;
+    # last_day NULL - без окончания, recurrence_skips - удалённые отдельные повторения
+    '''
+    CREATE TABLE recurrences (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        priority INTEGER NOT NULL CHECK(priority IN (1, 2, 3)),
+        duration INTEGER NOT NULL,
+        rule TEXT NOT NULL CHECK(rule IN ('daily', 'weekdays', 'weekly', 'monthly')),
+        first_day INTEGER NOT NULL,
+        last_day INTEGER,
+        earliest INTEGER,
+        deadline INTEGER,
+        fixed_start INTEGER,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE recurrence_skips (
+        recurrence_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        PRIMARY KEY (recurrence_id, day)
+    ) WITHOUT ROWID;
+    ''',
+    # Полнотекстовый поиск по названиям. Таблица без содержимого (rowid = id задачи), поэтому
+    # в индекс можно класть нормализованный текст: unicode61 не приравнивает ё к е.
+    # Префиксные индексы ускоряют поиск по первым буквам при наборе
+    '''
+    CREATE VIRTUAL TABLE tasks_fts USING fts5(
+        name, content='', tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    );
+    INSERT INTO tasks_fts (rowid, name)
+        SELECT id, replace(replace(name, 'ё', 'е'), 'Ё', 'Е') FROM tasks;
+
+    CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts (rowid, name) VALUES (NEW.id, replace(replace(NEW.name, 'ё', 'е'), 'Ё', 'Е'));
+    END;
+
+    CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, name) VALUES ('delete', OLD.id, replace(replace(OLD.name, 'ё', 'е'), 'Ё', 'Е'));
+    END;
+
+    CREATE TRIGGER tasks_fts_update AFTER UPDATE OF name ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, name) VALUES ('delete', OLD.id, replace(replace(OLD.name, 'ё', 'е'), 'Ё', 'Е'));
+        INSERT INTO tasks_fts (rowid, name) VALUES (NEW.id, replace(replace(NEW.name, 'ё', 'е'), 'Ё', 'Е'));
+    END;
+    ''',
+]
+
+
+def to_day(date_str):
+    return Date.fromisoformat(date_str).toordinal()
+
+
+def from_day(day):
+    return Date.fromordinal(day).isoformat()
+
+
+def normalize_date(date_str):
+    # Введённая вручную дата может быть без ведущих нулей (2025-7-1); дальше везде ГГГГ-ММ-ДД
+    return datetime.strptime(date_str, '%Y-%m-%d').date().isoformat()
+
+
+def base_letter(char):
+    # Латинская буква с диакритикой -> буква без неё, иначе None
+    parts = unicodedata.normalize('NFD', char)
+    if len(parts) > 1 and parts[0].isascii() and all(unicodedata.combining(part) for part in parts[1:]):
+        return parts[0]
+    return None
+
+
+# Приведение имён для поиска то же, что в tasks_fts: unicode61 remove_diacritics 2 убирает диакритику
+# только у латиницы (Café -> cafe), кириллицу не трогает, поэтому ё сводится к е отдельно
+SEARCH_FOLD = {code: base_letter(chr(code)) for code in chain(range(0xC0, 0x250), range(0x1E00, 0x1F00))
+               if base_letter(chr(code))}
+SEARCH_FOLD[ord('ё')] = 'е'
+
+
+def search_words(text):
+    return re.findall(r'\w+', text.lower().translate(SEARCH_FOLD))
+
+
+def search_query(text):
+    # Каждое слово ищется как префикс: "план ком" находит "Планёрка команды"
+    return ' '.join(f'"{word}"*' for word in search_words(text)) or None
+
+
+def occurs_on(rule, first_day, day):
+    if rule == 'daily':
+        return True
+    if rule == 'weekdays':
+        # Номер дня 1 - понедельник
+        return (day - 1) % 7 < 5
+    if rule == 'weekly':
+        return (day - first_day) % 7 == 0
+    # Ежемесячно: то же число, а в коротком месяце - его последний день
+    date, first = Date.fromordinal(day), Date.fromordinal(first_day)
+    return date.day == min(first.day, calendar.monthrange(date.year, date.month)[1])
+
+
+class Task:
+    # Запись задачи без __dict__; ранг приоритета и номер дня хранятся готовыми, подписи вычисляются по запросу
+    __slots__ = ('id', 'name', 'rank', 'duration', 'day', 'created_at', 'earliest', 'deadline', 'fixed_start')
+
+    def __init__(self, id, name, rank, duration, day, created_at=None, earliest=None, deadline=None, fixed_start=None):
+        self.id = id
+        self.name = name
+        self.rank = rank
+        self.duration = duration
+        self.day = day
+        self.created_at = created_at
+        self.earliest = earliest
+        self.deadline = deadline
+        self.fixed_start = fixed_start
+
+    @property
+    def priority(self):
+        return PRIORITY_NAMES[self.rank]
+
+    @property
+    def date(self):
+        return from_day(self.day)
+
+    @property
+    def recurrence_id(self):
+        # Повторения правила получают id = -id правила: в пределах дня он уникален
+        return -self.id if self.id < 0 else None
+
+    def __eq__(self, other):
+        if not isinstance(other, Task):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Task(id={self.id}, name={self.name!r}, priority={self.priority!r}, duration={self.duration}, date={self.date!r})"
+
+
+def task_from_row(row):
+    return Task(row['id'], row['name'], row['priority'], row['duration'], row['day'], row['created_at'],
+                row['earliest'], row['deadline'], row['fixed_start'])
+
+
+def occurrence_from_row(row, day):
+    return Task(-row['id'], row['name'], row['priority'], row['duration'], day, row['created_at'],
+                row['earliest'], row['deadline'], row['fixed_start'])
+
+
+def expand_occurrences(recurrences, day):
+    # recurrences - пары (правило, пропущенные дни) в порядке id правил
+    return tuple(
+        occurrence_from_row(row, day)
+        for row, skips in recurrences
+        if row['first_day'] <= day and (row['last_day'] is None or day <= row['last_day'])
+        and day not in skips and occurs_on(row['rule'], row['first_day'], day)
+    )
+
+
+class Storage(ABC):
+    # Интерфейс хранилища задач: окно планировщика, CLI, импорт, уведомления и замеры работают только через него.
+    # Даты - строки ГГГГ-ММ-ДД, задачи - Task; повторения правил (id = -id правила) идут в дне первыми
+
+    # Чтение задач
+    @abstractmethod
+    def get_tasks_by_date(self, date):
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_tasks_by_range(self, start_date, end_date):
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_tasks_by_date(self, date):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_tasks_page(self, date, offset, limit):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_task_date(self, task_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_task_by_id(self, task_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def search_tasks(self, text, limit=50, before_id=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_day_summaries(self, start_date, end_date, names_limit=3):
+        raise NotImplementedError
+
+    def get_day_summary(self, date):
+        # Для проверок при добавлении и редактировании задачи
+        summary = self.get_day_summaries(date, date, names_limit=0).get(date)
+        if summary is None:
+            summary = {'count': 0, 'duration': 0, 'top_priority': None, 'names': []}
+        return summary
+
+    # Изменение задач
+    @abstractmethod
+    def add_task(self, name, priority, duration, date, earliest=None, deadline=None, fixed_start=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_tasks(self, tasks):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_task(self, task_id, name, priority, duration, date, earliest=None, deadline=None, fixed_start=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def move_tasks(self, moves):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_task(self, task_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_tasks(self, task_ids):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_tasks_by_date(self, date):
+        raise NotImplementedError
+
+    # Повторяющиеся задачи
+    @abstractmethod
+    def get_recurrences(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_occurrences(self, day):
+        raise NotImplementedError
+
+    def get_occurrence(self, recurrence_id, date):
+        for task in self.get_occurrences(to_day(date)):
+            if task.recurrence_id == recurrence_id:
+                return task
+        return None
+
+    @abstractmethod
+    def get_recurrence(self, recurrence_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_recurrence(self, name, priority, duration, rule, start_date, end_date=None,
+                       earliest=None, deadline=None, fixed_start=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_recurrence(self, recurrence_id, name, priority, duration, earliest=None, deadline=None, fixed_start=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def skip_occurrence(self, recurrence_id, date):
+        raise NotImplementedError
+
+    @abstractmethod
+    def end_recurrence(self, recurrence_id, date):
+        raise NotImplementedError
+
+    # Кэши и ресурсы
+    def invalidate(self, date=None):
+        pass
+
+    def cache_stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+class Database(Storage):
+    # SQLite в файле или в памяти (':memory:')
+    def __init__(self, db_name='planner.db', cache_size=64, timeout=5.0):
+        self.db_name = db_name
+        self.timeout = timeout
+        # Своё соединение на каждый поток: UI и фоновые потоки читают параллельно с записью (WAL)
+        self.local = threading.local()
+        self.connections = {}
+        self.connections_lock = threading.Lock()
+        self.shared_conn = None
+        if db_name == ':memory:':
+            # У каждого соединения с :memory: своя база, поэтому здесь соединение одно на все потоки
+            self.shared_conn = self.connect()
+        self.migrate()
+
+        # LRU-кэш дата -> список задач, сбрасывается при каждой записи
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_generation = 0
+
+        # Правила повторения и их развёртка по дням (номер дня -> кортеж задач, LRU)
+        self.recurrences = None
+        self.occurrences = OrderedDict()
+        self.occurrences_size = max(cache_size, 1) * 8
+        self.recurrence_generation = 0
+
+    @property
+    def conn(self):
+        if self.shared_conn is not None:
+            return self.shared_conn
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.connect()
+            self.local.conn = conn
+        return conn
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_name, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        with self.connections_lock:
+            # Соединения завершившихся потоков больше никому не нужны
+            for thread in [thread for thread in self.connections if not thread.is_alive()]:
+                self.connections.pop(thread).close()
+            self.connections[threading.current_thread()] = conn
+        return conn
+
+    def close(self):
+        with self.connections_lock:
+            for conn in self.connections.values():
+                conn.close()
+            self.connections.clear()
+        self.local = threading.local()
+        self.shared_conn = None
+
+    def migrate(self):
+        cursor = self.conn.cursor()
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        # Файлы старых версий планировщика могут содержать tasks без created_at
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(tasks)")]
+        if columns and 'created_at' not in columns:
+            cursor.execute("ALTER TABLE tasks ADD COLUMN created_at TEXT")
+            self.conn.commit()
+        for version, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            # Каждая миграция - одна транзакция: при ошибке база остаётся в прежнем виде
+            try:
+                cursor.executescript(f"BEGIN; {script} PRAGMA user_version = {version}; COMMIT;")
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+
+    def get_tasks_by_date(self, date):
+        with self.cache_lock:
+            tasks = self.cache.get(date)
+            if tasks is not None:
+                self.cache.move_to_end(date)
+                self.cache_hits += 1
+                return list(tasks)
+            self.cache_misses += 1
+            generation = self.cache_generation
+
+        day = to_day(date)
+        tasks = list(self.get_occurrences(day))
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT * FROM tasks WHERE day=? ORDER BY id", (day,))
+        tasks.extend(task_from_row(row) for row in cursor.fetchall())
+
+        with self.cache_lock:
+            # Пока шёл запрос, другой поток мог изменить задачи - такой результат не кэшируем
+            if self.cache_size > 0 and generation == self.cache_generation:
+                self.cache[date] = tasks
+                self.cache.move_to_end(date)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return list(tasks)
+
+    def iter_tasks_by_range(self, start_date, end_date):
+        # Один запрос на весь диапазон; задачи отдаются по дням по мере чтения курсора: (дата, [Task])
+        first_day, last_day = to_day(start_date), to_day(end_date)
+        recurring = bool(self.get_recurrences())
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT * FROM tasks WHERE day BETWEEN ? AND ? ORDER BY day, id", (first_day, last_day))
+        groups = groupby(cursor, key=itemgetter('day'))
+        if not recurring:
+            for day, rows in groups:
+                yield from_day(day), [task_from_row(row) for row in rows]
+            return
+
+        # С правилами повторения день может быть непустым и без строк в tasks
+        group = next(groups, None)
+        for day in range(first_day, last_day + 1):
+            tasks = list(self.get_occurrences(day))
+            if group is not None and group[0] == day:
+                tasks.extend(task_from_row(row) for row in group[1])
+                group = next(groups, None)
+            if tasks:
+                yield from_day(day), tasks
+
+    def count_tasks_by_date(self, date):
+        day = to_day(date)
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM tasks WHERE day=?", (day,))
+        return len(self.get_occurrences(day)) + cursor.fetchone()[0]
+
+    def get_tasks_page(self, date, offset, limit):
+        # Та же сортировка, что и в get_tasks_by_date (сначала повторения), но только нужное окно строк
+        day = to_day(date)
+        occurrences = self.get_occurrences(day)
+        tasks = list(occurrences[offset:offset + limit])
+        if len(tasks) < limit:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT * FROM tasks WHERE day=? ORDER BY id LIMIT ? OFFSET ?",
+                           (day, limit - len(tasks), max(0, offset - len(occurrences))))
+            tasks.extend(task_from_row(row) for row in cursor.fetchall())
+        return tasks
+
+    def get_recurrences(self):
+        # Правил немного, поэтому они читаются целиком вместе с пропусками: [(строка, множество пропущенных дней)]
+        with self.cache_lock:
+            if self.recurrences is not None:
+                return self.recurrences
+            generation = self.recurrence_generation
+
+        cursor = self.conn.cursor()
+        skips = {}
+        for row in cursor.execute("SELECT recurrence_id, day FROM recurrence_skips"):
+            skips.setdefault(row['recurrence_id'], set()).add(row['day'])
+        recurrences = [(row, skips.get(row['id'], frozenset()))
+                       for row in cursor.execute("SELECT * FROM recurrences ORDER BY id").fetchall()]
+
+        with self.cache_lock:
+            if generation == self.recurrence_generation:
+                self.recurrences = recurrences
+        return recurrences
+
+    def search_tasks(self, text, limit=50, before_id=None):
+        # Сначала новые задачи; следующая страница - before_id = id последней задачи предыдущей.
+        # Порядок по rowid FTS не требует сортировки всех совпадений, поэтому частый префикс не тормозит
+        query = search_query(text)
+        if query is None:
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT tasks.* FROM tasks_fts JOIN tasks ON tasks.id = tasks_fts.rowid
+        WHERE tasks_fts MATCH ? AND tasks_fts.rowid < ?
+        ORDER BY tasks_fts.rowid DESC
+        LIMIT ?
+        ''', (query, before_id if before_id is not None else 2 ** 63 - 1, limit))
+        return [task_from_row(row) for row in cursor.fetchall()]
+
+    def get_occurrences(self, day):
+        # Повторения на день; развёртка кэшируется, чтобы календарь и уведомления не пересчитывали правила
+        with self.cache_lock:
+            tasks = self.occurrences.get(day)
+            if tasks is not None:
+                self.occurrences.move_to_end(day)
+                return tasks
+            generation = self.recurrence_generation
+
+        tasks = expand_occurrences(self.get_recurrences(), day)
+
+        with self.cache_lock:
+            if generation == self.recurrence_generation:
+                self.occurrences[day] = tasks
+                while len(self.occurrences) > self.occurrences_size:
+                    self.occurrences.popitem(last=False)
+        return tasks
+
+    def get_recurrence(self, recurrence_id):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT * FROM recurrences WHERE id=?", (recurrence_id,))
+        return cursor.fetchone()
+
+    def invalidate(self, date=None):
+        with self.cache_lock:
+            self.cache_generation += 1
+            if date is None:
+                self.cache.clear()
+            else:
+                self.cache.pop(date, None)
+
+    def invalidate_recurrences(self):
+        with self.cache_lock:
+            self.recurrence_generation += 1
+            self.recurrences = None
+            self.occurrences.clear()
+        self.invalidate()
+
+    def cache_stats(self):
+        with self.cache_lock:
+            return {'hits': self.cache_hits, 'misses': self.cache_misses, 'size': len(self.cache),
+                    'occurrences': len(self.occurrences)}
+
+    def get_task_date(self, task_id):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT day FROM tasks WHERE id=?", (task_id,))
+        row = cursor.fetchone()
+        return from_day(row['day']) if row else None
+
+    def get_task_by_id(self, task_id):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT * FROM tasks WHERE id=?", (task_id,))
+        row = cursor.fetchone()
+        return task_from_row(row) if row else None
+
+    def get_day_summaries(self, start_date, end_date, names_limit=3):
+        # Итоги по дням читаются из day_totals; названия нужны только подсказке календаря
+        first_day, last_day = to_day(start_date), to_day(end_date)
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT day, task_count, total_duration,
+               CASE WHEN high_count > 0 THEN 1 WHEN medium_count > 0 THEN 2 ELSE 3 END AS top_rank
+        FROM day_totals
+        WHERE day BETWEEN ? AND ?
+        ''', (first_day, last_day))
+
+        summaries = {}
+        for row in cursor.fetchall():
+            summaries[from_day(row['day'])] = {
+                'count': row['task_count'],
+                'duration': row['total_duration'],
+                'top_priority': PRIORITY_NAMES[row['top_rank']],
+                'names': []
+            }
+
+        # Повторения в day_totals не попадают - добавляем их из развёртки; они же идут первыми в списке названий
+        if self.get_recurrences():
+            for day in range(first_day, last_day + 1):
+                occurrences = self.get_occurrences(day)
+                if not occurrences:
+                    continue
+                summary = summaries.setdefault(from_day(day), {'count': 0, 'duration': 0, 'top_priority': None, 'names': []})
+                summary['count'] += len(occurrences)
+                summary['duration'] += sum(task.duration for task in occurrences)
+                rank = min(task.rank for task in occurrences)
+                if summary['top_priority'] is None or rank < PRIORITY_ORDER[summary['top_priority']]:
+                    summary['top_priority'] = PRIORITY_NAMES[rank]
+                summary['names'] = [task.name for task in occurrences[:names_limit]]
+
+        if names_limit > 0 and summaries:
+            cursor.execute('''
+            SELECT day, name FROM (
+                SELECT day, name, ROW_NUMBER() OVER (PARTITION BY day ORDER BY id) AS row_num
+                FROM tasks
+                WHERE day BETWEEN ? AND ?
+            )
+            WHERE row_num <= ?
+            ORDER BY day, row_num
+            ''', (first_day, last_day, names_limit))
+            for row in cursor.fetchall():
+                names = summaries[from_day(row['day'])]['names']
+                if len(names) < names_limit:
+                    names.append(row['name'])
+        return summaries
+
+    def add_task(self, name, priority, duration, date, earliest=None, deadline=None, fixed_start=None):
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "INSERT INTO tasks (name, priority, duration, day, earliest, deadline, fixed_start) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (name, PRIORITY_ORDER[priority], duration, to_day(date), earliest, deadline, fixed_start)
+        )
+        self.conn.commit()
+        self.invalidate(date)
+        return cursor.lastrowid
+
+    def add_tasks(self, tasks):
+        # Пакетная вставка одной транзакцией; tasks - словари с name, priority, duration, date
+        # и необязательными earliest, deadline, fixed_start
+        tasks = list(tasks)
+        with self.conn:
+            cursor = self.conn.executemany(
+                "INSERT INTO tasks (name, priority, duration, day, earliest, deadline, fixed_start) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((task['name'], PRIORITY_ORDER[task['priority']], task['duration'], to_day(task['date']),
+                  task.get('earliest'), task.get('deadline'), task.get('fixed_start'))
+                 for task in tasks)
+            )
+        for date in {task['date'] for task in tasks}:
+            self.invalidate(date)
+        return cursor.rowcount
+
+    def update_task(self, task_id, name, priority, duration, date, earliest=None, deadline=None, fixed_start=None):
+        old_date = self.get_task_date(task_id)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "UPDATE tasks SET name=?, priority=?, duration=?, day=?, earliest=?, deadline=?, fixed_start=? WHERE id=?",
+            (name, PRIORITY_ORDER[priority], duration, to_day(date), earliest, deadline, fixed_start, task_id)
+        )
+        self.conn.commit()
+        if old_date:
+            self.invalidate(old_date)
+        self.invalidate(date)
+
+    def add_recurrence(self, name, priority, duration, rule, start_date, end_date=None,
+                       earliest=None, deadline=None, fixed_start=None):
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "INSERT INTO recurrences (name, priority, duration, rule, first_day, last_day, earliest, deadline, fixed_start)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (name, PRIORITY_ORDER[priority], duration, rule, to_day(start_date),
+             to_day(end_date) if end_date else None, earliest, deadline, fixed_start)
+        )
+        self.conn.commit()
+        self.invalidate_recurrences()
+        return cursor.lastrowid
+
+    def update_recurrence(self, recurrence_id, name, priority, duration, earliest=None, deadline=None, fixed_start=None):
+        # Меняется всё правило, то есть все его повторения
+        self.conn.execute(
+            "UPDATE recurrences SET name=?, priority=?, duration=?, earliest=?, deadline=?, fixed_start=? WHERE id=?",
+            (name, PRIORITY_ORDER[priority], duration, earliest, deadline, fixed_start, recurrence_id)
+        )
+        self.conn.commit()
+        self.invalidate_recurrences()
+
+    def skip_occurrence(self, recurrence_id, date):
+        self.conn.execute("INSERT OR IGNORE INTO recurrence_skips VALUES (?, ?)", (recurrence_id, to_day(date)))
+        self.conn.commit()
+        self.invalidate_recurrences()
+
+    def end_recurrence(self, recurrence_id, date):
+        # Повторения начиная с date удаляются, прошлые остаются; правило без повторений удаляется целиком
+        day = to_day(date)
+        with self.conn:
+            self.conn.execute("UPDATE recurrences SET last_day=MIN(COALESCE(last_day, ?1), ?1) WHERE id=?2", (day - 1, recurrence_id))
+            self.conn.execute("DELETE FROM recurrence_skips WHERE recurrence_id=? AND day >= ?", (recurrence_id, day))
+            cursor = self.conn.execute("DELETE FROM recurrences WHERE id=? AND first_day >= ?", (recurrence_id, day))
+            if cursor.rowcount:
+                self.conn.execute("DELETE FROM recurrence_skips WHERE recurrence_id=?", (recurrence_id,))
+        self.invalidate_recurrences()
+
+    def move_tasks(self, moves):
+        # moves - пары (id задачи, новая дата)
+        with self.conn:
+            cursor = self.conn.executemany(
+                "UPDATE tasks SET day=? WHERE id=?",
+                ((to_day(date), task_id) for task_id, date in moves)
+            )
+        self.invalidate()
+        return cursor.rowcount
+
+    def delete_task(self, task_id):
+        old_date = self.get_task_date(task_id)
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM tasks WHERE id=?", (task_id,))
+        self.conn.commit()
+        if old_date:
+            self.invalidate(old_date)
+
+    def delete_tasks(self, task_ids):
+        with self.conn:
+            cursor = self.conn.executemany("DELETE FROM tasks WHERE id=?", ((task_id,) for task_id in task_ids))
+        # Даты удалённых задач неизвестны - сбрасываем кэш целиком
+        self.invalidate()
+        return cursor.rowcount
+
+    def delete_tasks_by_date(self, date):
+        # Повторения этого дня пропускаются, сами правила остаются
+        day = to_day(date)
+        occurrences = self.get_occurrences(day)
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM tasks WHERE day=?", (day,))
+            self.conn.executemany("INSERT OR IGNORE INTO recurrence_skips VALUES (?, ?)",
+                                  ((task.recurrence_id, day) for task in occurrences))
+        if occurrences:
+            self.invalidate_recurrences()
+        else:
+            self.invalidate(date)
+        return cursor.rowcount + len(occurrences)
+
+    def __del__(self):
+        self.close()
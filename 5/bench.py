@@ -0,0 +1,164 @@
+import argparse
+import calendar
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date as Date, datetime, timedelta
+
+from base import PRIORITY_ORDER, RECURRENCE_NAMES
+from notifier import NotificationScheduler
+from report import write_report
+from schedule import DAY_MINUTES, build_schedule, plan_schedule
+from storage import BACKENDS, open_storage
+
+FIRST_DAY = Date(2025, 1, 1)
+DAYS = 365
+SEED_BATCH = 50000
+RECURRENCES = 20
+
+
+def seed(db, count, rng):
+    priorities = list(PRIORITY_ORDER)
+    for offset in range(0, count, SEED_BATCH):
+        db.add_tasks({
+            'name': f"Задача {number}",
+            'priority': rng.choice(priorities),
+            'duration': rng.randint(5, 120),
+            'date': (FIRST_DAY + timedelta(days=rng.randrange(DAYS))).isoformat()
+        } for number in range(offset, min(offset + SEED_BATCH, count)))
+
+
+def seed_recurrences(db, count, rng):
+    priorities = list(PRIORITY_ORDER)
+    rules = list(RECURRENCE_NAMES)
+    for number in range(count):
+        db.add_recurrence(f"Повтор {number}", rng.choice(priorities), rng.randint(5, 30), rules[number % len(rules)],
+                          (FIRST_DAY + timedelta(days=rng.randrange(DAYS))).isoformat())
+
+
+def busiest_date(db):
+    last = FIRST_DAY + timedelta(days=DAYS - 1)
+    summaries = db.get_day_summaries(FIRST_DAY.isoformat(), last.isoformat(), names_limit=0)
+    return Date.fromisoformat(max(summaries, key=lambda date: summaries[date]['count']))
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def run_size(path, count, repeat, rng, backend):
+    db = open_storage(path, backend, cache_size=0)
+    seed(db, count, rng)
+    day = busiest_date(db)
+    date = day.isoformat()
+    year, month = day.year, day.month
+    month_dates = [f"{year:04d}-{month:02d}-{number:02d}" for number in range(1, calendar.monthrange(year, month)[1] + 1)]
+
+    # Второе соединение к той же базе в памяти открыть нельзя, поэтому для 'memory' замера с кэшем нет
+    cached_db = open_storage(path, backend) if backend != 'memory' else None
+    if cached_db is not None:
+        cached_db.get_tasks_by_date(date)
+    tasks = db.get_tasks_by_date(date)
+    slots = build_schedule(tasks)
+
+    # Только правила повторения, отдельно от задач, чтобы остальные замеры не менялись
+    root, extension = os.path.splitext(path)
+    recurring_db = open_storage(f"{root}_recurring{extension}" if backend != 'memory' else path, backend)
+    seed_recurrences(recurring_db, RECURRENCES, rng)
+
+    notifier = NotificationScheduler(db, lambda: "00:00", lambda title, message, task_id: None)
+    day_start = datetime(year, month, day.day)
+    day_end = day_start + timedelta(minutes=DAY_MINUTES - 1)
+
+    def notifier_day():
+        notifier.rebuild(day_start)
+        for _ in notifier.pop_due(day_end):
+            pass
+
+    benchmarks = [
+        ('get_tasks_by_date', lambda: db.get_tasks_by_date(date)),
+        ('get_tasks_by_date_cached', lambda: cached_db.get_tasks_by_date(date) if cached_db else None),
+        ('calendar_month_per_day', lambda: [db.get_tasks_by_date(month_date) for month_date in month_dates]),
+        ('calendar_month_summaries', lambda: db.get_day_summaries(month_dates[0], month_dates[-1])),
+        ('day_summary', lambda: db.get_day_summary(date)),
+        ('calendar_month_recurring', lambda: recurring_db.get_day_summaries(month_dates[0], month_dates[-1])),
+        # Префикс совпадает со всеми задачами - худший случай для поиска при наборе
+        ('search_prefix', lambda: db.search_tasks("зад", 50)),
+        ('search_word', lambda: db.search_tasks(f"задача {count // 2}", 50)),
+        ('build_schedule', lambda: build_schedule(tasks)),
+        ('plan_schedule', lambda: plan_schedule(tasks)),
+        ('text_report', lambda: write_report(io.StringIO(), [(date, slots)], 'text')),
+        ('ics_report', lambda: write_report(io.StringIO(), [(date, slots)], 'ics')),
+        ('notifier_day', notifier_day),
+        # Запись последней, чтобы не менять данные для замеров чтения
+        ('add_task', lambda: db.add_task("Замер", "Средний", 5, date)),
+    ]
+    if cached_db is None:
+        benchmarks = [benchmark for benchmark in benchmarks if benchmark[0] != 'get_tasks_by_date_cached']
+
+    results = []
+    for name, func in benchmarks:
+        timings = measure(func, repeat)
+        results.append({
+            'benchmark': name,
+            'backend': backend,
+            'tasks': count,
+            'day_tasks': len(tasks),
+            'repeat': repeat,
+            'min': min(timings),
+            'median': statistics.median(timings)
+        })
+    recurring_db.close()
+    if cached_db is not None:
+        cached_db.close()
+    db.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры горячих путей планировщика на синтетических базах")
+    parser.add_argument('--sizes', default="1000,10000,100000",
+                        help="число задач через запятую, например 1000,10000,100000,1000000")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--backends', default="sqlite",
+                        help=f"хранилища через запятую: {', '.join(BACKENDS)}")
+    parser.add_argument('--output', '-o', help="файл для JSON lines (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    out.write(json.dumps({
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform()
+    }) + "\n")
+
+    paths = {'sqlite': "bench_{count}.db", 'log': "bench_{count}.log"}
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (int(size) for size in args.sizes.split(',')):
+            for backend in args.backends.split(','):
+                # Для каждого хранилища одни и те же данные
+                rng = random.Random(f"{args.seed}:{count}")
+                path = os.path.join(tmp, paths[backend].format(count=count)) if backend in paths else ':memory:'
+                for result in run_size(path, count, args.repeat, rng, backend):
+                    out.write(json.dumps(result) + "\n")
+                out.flush()
+
+    if out is not sys.stdout:
+        out.close()
+
+
+if __name__ == "__main__":
+    main()
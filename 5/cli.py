@@ -0,0 +1,123 @@
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date as Date, timedelta
+from itertools import repeat
+
+from base import normalize_date
+from report import SINKS, write_report
+from schedule import each_day, parse_time, plan_days, plan_schedule, rolled_over
+from storage import BACKENDS, detect_backend, open_storage
+
+# Своё соединение в каждом процессе пула
+worker_db = None
+
+
+def init_worker(db_name, backend=None):
+    global worker_db
+    worker_db = open_storage(db_name, backend)
+
+
+def schedule_day(date, start):
+    return date, plan_schedule(worker_db.get_tasks_by_date(date), start)
+
+
+def date_range(first, last):
+    day = first
+    while day <= last:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+
+def planned_days(results):
+    for date, plan in results:
+        if plan.unscheduled:
+            names = ", ".join(task.name for task in plan.unscheduled)
+            print(f"На {date} не поместились задачи ({len(plan.unscheduled)}): {names}", file=sys.stderr)
+        yield date, plan.slots
+
+
+def rollover_days(plans, moves):
+    for date, plan in plans:
+        moves.extend(rolled_over(date, plan))
+        yield date, plan.slots
+
+
+def run_rollover(args, out, start):
+    # Дни зависят друг от друга, поэтому весь диапазон считается одним проходом в одном процессе
+    db = open_storage(args.db, args.backend)
+    moves = []
+    leftovers = []
+    try:
+        days = each_day(date_range(args.first, args.last),
+                        db.iter_tasks_by_range(args.first.isoformat(), args.last.isoformat()))
+        write_report(out, rollover_days(plan_days(days, start, leftovers=leftovers), moves), args.format, start)
+
+        print(f"Перенесено задач на другие дни: {len(moves)}", file=sys.stderr)
+        if leftovers:
+            names = ", ".join(task.name for task in leftovers)
+            print(f"Не поместились в диапазон ({len(leftovers)}): {names}", file=sys.stderr)
+        if args.apply and moves:
+            db.move_tasks(moves)
+    finally:
+        db.close()
+
+
+def parse_date(value):
+    return Date.fromisoformat(normalize_date(value))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Генерация расписаний за диапазон дат без графического интерфейса")
+    parser.add_argument('--db', default='planner.db', help="файл базы данных")
+    # База в памяти живёт только в открывшем её процессе: читать расписания CLI было бы не из чего
+    parser.add_argument('--backend', choices=[name for name in BACKENDS if name != 'memory'],
+                        help="хранилище (по умолчанию по расширению файла)")
+    parser.add_argument('--from', dest='first', type=parse_date, required=True, help="первая дата, ГГГГ-ММ-ДД")
+    parser.add_argument('--to', dest='last', type=parse_date, required=True, help="последняя дата, ГГГГ-ММ-ДД")
+    parser.add_argument('--start', default="09:00", help="начало дня, ЧЧ:ММ")
+    parser.add_argument('--format', choices=list(SINKS), default='jsonl')
+    parser.add_argument('--output', '-o', help="файл результата (по умолчанию stdout)")
+    parser.add_argument('--workers', type=int, default=None, help="число процессов (1 - без пула)")
+    parser.add_argument('--rollover', action='store_true', help="переносить то, что не поместилось, на следующие дни")
+    parser.add_argument('--apply', action='store_true', help="вместе с --rollover: сохранить новые даты задач в базе")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.last < args.first:
+        sys.exit("Ошибка: дата --to раньше даты --from")
+    if args.apply and not args.rollover:
+        sys.exit("Ошибка: --apply используется только вместе с --rollover")
+    if (args.backend or detect_backend(args.db)) == 'memory':
+        sys.exit("Ошибка: база в памяти не подходит для CLI, укажите файл в --db")
+
+    # Миграции схемы выполняются один раз здесь, а не параллельно в каждом процессе
+    open_storage(args.db, args.backend).close()
+
+    out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    dates = date_range(args.first, args.last)
+    start = parse_time(args.start)
+    executor = None
+    try:
+        if args.rollover:
+            run_rollover(args, out, start)
+        elif args.workers == 1:
+            init_worker(args.db, args.backend)
+            results = map(schedule_day, dates, repeat(start))
+        else:
+            executor = ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(args.db, args.backend))
+            results = executor.map(schedule_day, dates, repeat(start), chunksize=8)
+
+        if not args.rollover:
+            write_report(out, planned_days(results), args.format, start)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import sys
+import threading
+from collections import OrderedDict
+
+POLL_MS = 50
+
+
+class UiDispatcher:
+    def __init__(self, root, maxsize=256, poll_ms=POLL_MS):
+        self.root = root
+        self.maxsize = maxsize
+        self.poll_ms = poll_ms
+        self.lock = threading.Lock()
+        # Ключ события -> (функция, аргументы); новое событие с тем же ключом заменяет старое
+        self.events = OrderedDict()
+        self.dropped = 0
+        self.root.after(self.poll_ms, self.drain)
+
+    def post(self, callback, *args, key=None):
+        # Можно вызывать из любого потока; сама функция выполнится в потоке Tk
+        if key is None:
+            key = object()
+        with self.lock:
+            if key in self.events:
+                del self.events[key]
+            elif len(self.events) >= self.maxsize:
+                self.events.popitem(last=False)
+                self.dropped += 1
+            self.events[key] = (callback, args)
+
+    def drain(self):
+        self.root.after(self.poll_ms, self.drain)
+        with self.lock:
+            events = list(self.events.values())
+            self.events.clear()
+        for callback, args in events:
+            try:
+                callback(*args)
+            except Exception:
+                # Ошибка одного события не должна терять остальные
+                self.root.report_callback_exception(*sys.exc_info())
@@ -0,0 +1,283 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from itertools import chain
+
+from base import PRIORITY_NAMES, PRIORITY_ORDER, normalize_date
+from schedule import DAY_MINUTES, DEFAULT_START, check_constraints, day_end, parse_time
+from storage import BACKENDS, detect_backend, open_storage
+
+CHUNK_SIZE = 1000
+READ_SIZE = 64 * 1024
+FORMATS = {'.csv': 'csv', '.json': 'json', '.jsonl': 'json', '.ics': 'ics'}
+# Необязательные поля с ограничениями планировщика (ЧЧ:ММ) -> столбец базы
+CONSTRAINT_FIELDS = [('earliest', 'earliest'), ('deadline', 'deadline'), ('fixed', 'fixed_start')]
+ICS_DURATION = re.compile(r'^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+
+def read_csv(file):
+    # Подходит и для CSV, выгруженного планировщиком: лишние столбцы игнорируются
+    for number, record in enumerate(csv.DictReader(file), start=1):
+        yield number, record
+
+
+def read_json(file):
+    # JSON-массив разбирается по одному элементу, JSON lines - по одной строке
+    first = file.read(1)
+    while first and first.isspace():
+        first = file.read(1)
+    if first == '[':
+        yield from read_json_array(file)
+        return
+
+    number = 0
+    for line in chain([first + file.readline()], file) if first else ():
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f"некорректный JSON: {e}")
+
+
+def read_json_array(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    number = 0
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,')
+        if buffer.startswith(']'):
+            return
+        try:
+            record, end = decoder.raw_decode(buffer)
+        except ValueError as e:
+            if eof:
+                # Дальше разобрать массив нельзя, но уже прочитанные записи сохраняются
+                yield number + 1, ValueError(f"некорректный JSON: {e}" if buffer else "JSON-массив не закрыт")
+                return
+            chunk = file.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        number += 1
+        yield number, record
+        buffer = buffer[end:]
+
+
+def ics_unescape(text):
+    return re.sub(r'\\([\\;,nN])', lambda m: '\n' if m.group(1) in 'nN' else m.group(1), text)
+
+
+def ics_lines(file):
+    # Склеиваем перенесённые строки (продолжение начинается с пробела или табуляции)
+    current = None
+    for line in file:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def ics_datetime(value):
+    value = value.rstrip('Z')
+    if 'T' in value:
+        return datetime.strptime(value[:15], '%Y%m%dT%H%M%S')
+    return datetime.strptime(value[:8], '%Y%m%d')
+
+
+def ics_minutes(value):
+    match = ICS_DURATION.match(value)
+    if not match:
+        raise ValueError(f"некорректная длительность {value}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    total = ((int(weeks or 0) * 7 + int(days or 0)) * 24 + int(hours or 0)) * 60 + int(minutes or 0) + int(seconds or 0) // 60
+    return -total if sign == '-' else total
+
+
+def ics_priority(properties):
+    # PRIORITY по RFC 5545: 1-4 высокий, 5 средний, 6-9 низкий; иначе ищем подпись из нашего экспорта
+    value = properties.get('PRIORITY', '0')
+    if value.isdigit() and int(value) > 0:
+        rank = 1 if int(value) <= 4 else 2 if int(value) == 5 else 3
+        return PRIORITY_NAMES[rank]
+    description = properties.get('DESCRIPTION', '')
+    for name in PRIORITY_ORDER:
+        if f"Приоритет: {name}" in description:
+            return name
+    return "Средний"
+
+
+def ics_record(properties):
+    if 'DTSTART' not in properties:
+        raise ValueError("нет DTSTART")
+    start = ics_datetime(properties['DTSTART'])
+    if 'DTEND' in properties:
+        duration = int((ics_datetime(properties['DTEND']) - start).total_seconds() // 60)
+    elif 'DURATION' in properties:
+        duration = ics_minutes(properties['DURATION'])
+    else:
+        raise ValueError("нет DTEND или DURATION")
+    return {
+        'name': properties.get('SUMMARY', ''),
+        'priority': ics_priority(properties),
+        'duration': duration,
+        'date': start.date().isoformat()
+    }
+
+
+def read_ics(file):
+    number = 0
+    properties = None
+    for line in ics_lines(file):
+        name, _, value = line.partition(':')
+        name = name.split(';', 1)[0].upper()
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            properties = {}
+        elif name == 'END' and value.upper() == 'VEVENT' and properties is not None:
+            number += 1
+            try:
+                yield number, ics_record(properties)
+            except ValueError as e:
+                yield number, e
+            properties = None
+        elif properties is not None and name not in properties:
+            properties[name] = ics_unescape(value)
+
+
+READERS = {'csv': read_csv, 'json': read_json, 'ics': read_ics}
+
+
+def parse_record(record):
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("запись должна быть объектом")
+
+    name = str(record.get('name') or '').strip()
+    if not name:
+        raise ValueError("не указано название задачи")
+
+    priority = str(record.get('priority') or '').strip()
+    if priority.isdigit() and int(priority) in PRIORITY_NAMES:
+        priority = PRIORITY_NAMES[int(priority)]
+    if priority not in PRIORITY_ORDER:
+        raise ValueError(f"неизвестный приоритет {priority!r}")
+
+    try:
+        duration = int(record.get('duration'))
+    except (TypeError, ValueError):
+        raise ValueError("длительность должна быть числом")
+    if duration <= 0:
+        raise ValueError("длительность должна быть положительным числом")
+
+    try:
+        date = normalize_date(str(record.get('date') or '').strip())
+    except ValueError:
+        raise ValueError("неверный формат даты, используйте ГГГГ-ММ-ДД")
+
+    task = {'name': name, 'priority': priority, 'duration': duration, 'date': date}
+    for field, column in CONSTRAINT_FIELDS:
+        value = str(record.get(field) or '').strip()
+        task[column] = parse_time(value, None) if value else None
+        if value and task[column] is None:
+            raise ValueError(f"неверное время в поле {field}, используйте ЧЧ:ММ")
+    error = check_constraints(duration, task['earliest'], task['deadline'], task['fixed_start'])
+    if error:
+        raise ValueError(error)
+    return task
+
+
+def import_tasks(db, records, start=DEFAULT_START, chunk_size=CHUNK_SIZE):
+    # records - пары (номер записи, запись); ошибочные записи пропускаются, остальные пишутся пачками
+    totals = {}
+    batch = []
+    imported = 0
+    errors = []
+    for number, record in records:
+        try:
+            task = parse_record(record)
+        except ValueError as e:
+            errors.append((number, str(e)))
+            continue
+
+        date, duration = task['date'], task['duration']
+        total = totals.get(date)
+        if total is None:
+            summary = db.get_day_summary(date)
+            total = totals[date] = [summary['count'], summary['duration']]
+
+        # Те же правила, что и при добавлении задачи вручную
+        if total[1] + duration > DAY_MINUTES:
+            errors.append((number, f"общая длительность задач на {date} превысит 24 часа (1440 минут)"))
+            continue
+        if day_end(start, total[0] + 1, total[1] + duration) > DAY_MINUTES:
+            errors.append((number, f"расписание на {date} выйдет за пределы дня (после 23:59)"))
+            continue
+
+        total[0] += 1
+        total[1] += duration
+        batch.append(task)
+        if len(batch) >= chunk_size:
+            imported += db.add_tasks(batch)
+            batch = []
+
+    if batch:
+        imported += db.add_tasks(batch)
+    return {'imported': imported, 'errors': errors, 'dates': sorted(totals)}
+
+
+def detect_format(path):
+    format = FORMATS.get(os.path.splitext(path)[1].lower())
+    if format is None:
+        raise ValueError(f"Неизвестный формат файла: {os.path.basename(path)}")
+    return format
+
+
+def import_file(db, path, format=None, start=DEFAULT_START, chunk_size=CHUNK_SIZE):
+    format = format or detect_format(path)
+    # utf-8-sig: CSV из Excel часто начинается с BOM
+    with open(path, encoding='utf-8-sig', newline='') as file:
+        return import_tasks(db, READERS[format](file), start, chunk_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Импорт задач из CSV, JSON или iCalendar")
+    parser.add_argument('path', help="файл для импорта")
+    parser.add_argument('--db', default='planner.db', help="файл базы данных")
+    # Импорт в базу в памяти пропал бы вместе с процессом
+    parser.add_argument('--backend', choices=[name for name in BACKENDS if name != 'memory'],
+                        help="хранилище (по умолчанию по расширению файла)")
+    parser.add_argument('--format', choices=list(READERS), help="формат файла (по умолчанию по расширению)")
+    parser.add_argument('--start', default="09:00", help="начало дня для проверки расписания, ЧЧ:ММ")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="задач в одной транзакции")
+    args = parser.parse_args(argv)
+    if (args.backend or detect_backend(args.db)) == 'memory':
+        sys.exit("Ошибка: база в памяти не подходит для импорта, укажите файл в --db")
+
+    db = open_storage(args.db, args.backend)
+    try:
+        result = import_file(db, args.path, args.format, parse_time(args.start), args.chunk_size)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Ошибка: {e}")
+    finally:
+        db.close()
+
+    for number, message in result['errors']:
+        print(f"Запись {number}: {message}", file=sys.stderr)
+    print(f"Импортировано задач: {result['imported']}, ошибок: {len(result['errors'])}")
+    return 1 if result['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundLoader:
+    def __init__(self, dispatcher, workers=2):
+        self.dispatcher = dispatcher
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='planner-db')
+        # Ключ запроса -> последний отправленный future; более старые результаты отбрасываются
+        self.pending = {}
+
+    def submit(self, key, func, on_done, on_error=None):
+        self.cancel(key)
+        future = self.executor.submit(func)
+        self.pending[key] = future
+        future.add_done_callback(
+            lambda f: self.dispatcher.post(self.deliver, key, f, on_done, on_error, key=('loader', key))
+        )
+        return future
+
+    def cancel(self, key):
+        future = self.pending.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def is_loading(self, key):
+        return key in self.pending
+
+    def deliver(self, key, future, on_done, on_error):
+        # Вызывается диспетчером в потоке Tk
+        if future.cancelled() or self.pending.get(key) is not future:
+            return
+        del self.pending[key]
+
+        error = future.exception()
+        if error is None:
+            on_done(future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            raise error
+
+    def shutdown(self):
+        for key in list(self.pending):
+            self.cancel(key)
+        self.executor.shutdown(wait=False)
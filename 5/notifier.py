@@ -0,0 +1,89 @@
+import heapq
+import threading
+from datetime import datetime, timedelta
+
+from schedule import parse_time, plan_schedule
+
+REMINDER_MINUTES = 5
+# Потолок ожидания: монотонные часы не идут во время сна системы
+MAX_SLEEP_SECONDS = 60
+
+
+class NotificationScheduler:
+    def __init__(self, db, get_start_time, notify):
+        self.db = db
+        self.get_start_time = get_start_time
+        self.notify = notify
+
+        self.events = []
+        self.stale = True
+        self.wakeup = threading.Event()
+        self.last_check = datetime.now()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def invalidate(self, date=None):
+        # Пересчёт нужен только если изменились задачи на сегодня
+        if date is None or date == datetime.now().strftime('%Y-%m-%d'):
+            self.stale = True
+            self.wakeup.set()
+
+    def rebuild(self, now):
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        tasks = self.db.get_tasks_by_date(now.strftime('%Y-%m-%d'))
+
+        events = [(midnight + timedelta(days=1), 0, 'day', None, None, None)]
+        for slot in plan_schedule(tasks, parse_time(self.get_start_time())).slots:
+            task_start = midnight + timedelta(minutes=slot.start)
+            task_end = midnight + timedelta(minutes=slot.end)
+            events.append((task_start - timedelta(minutes=REMINDER_MINUTES), slot.task.id, 'reminder',
+                           slot.task, task_start, task_end))
+            events.append((task_start, slot.task.id, 'start', slot.task, task_start, task_end))
+
+        heapq.heapify(events)
+        self.events = events
+
+    def pop_due(self, now):
+        due = {}
+        while self.events and self.events[0][0] <= now:
+            instant, task_id, kind, task, task_start, task_end = heapq.heappop(self.events)
+            if kind == 'day':
+                self.stale = True
+            elif instant > self.last_check:
+                # Если проспали и напоминание, и начало задачи, показываем только начало
+                if kind == 'start' or task_id not in due:
+                    due[task_id] = (kind, task, task_start, task_end)
+        return due.values()
+
+    def run(self):
+        while True:
+            now = datetime.now()
+            if self.stale:
+                self.stale = False
+                self.wakeup.clear()
+                self.rebuild(now)
+
+            for kind, task, task_start, task_end in self.pop_due(now):
+                if kind == 'reminder':
+                    title = "Напоминание"
+                    text = f"Через {REMINDER_MINUTES} минут начинается задача: {task.name}\n"
+                else:
+                    title = "Начало задачи"
+                    text = f"Сейчас начинается задача: {task.name}\n"
+                self.notify(
+                    title,
+                    text +
+                    f"Время: {task_start.strftime('%H:%M')} - {task_end.strftime('%H:%M')}\n"
+                    f"Приоритет: {task.priority}",
+                    task.id
+                )
+            self.last_check = now
+
+            if self.stale:
+                continue
+            timeout = MAX_SLEEP_SECONDS
+            if self.events:
+                timeout = min(timeout, max((self.events[0][0] - datetime.now()).total_seconds(), 0))
+            self.wakeup.wait(timeout)
@@ -1,11 +1,23 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 import calendar
-import winsound
-import threading
-import time
-from base import Database 
+import os
+from base import RECURRENCE_NAMES, normalize_date
+from dispatch import UiDispatcher
+from importer import import_file
+from loader import BackgroundLoader
+from notifier import NotificationScheduler
+from report import EXTENSIONS, write_report
+from schedule import DAY_MINUTES, check_constraints, day_end, each_day, format_time, parse_time, plan_days, plan_schedule, rolled_over
+from sound import SoundPlayer
+from storage import open_storage
+from virtual import PAGE_SIZE, VirtualTree
+
+SEARCH_PAGE = 50
+# Поиск запускается, когда пауза в наборе дольше этой
+SEARCH_DELAY_MS = 150
 
 class ModernPlanner:
     def __init__(self, root):
@@ -14,20 +26,29 @@ class ModernPlanner:
         self.root.geometry("1000x600")
         self.setup_style()
     
-        self.db = Database()
+        # Хранилище выбирается по расширению файла: planner.db - SQLite, *.log - журнал
+        self.db = open_storage(os.environ.get('PLANNER_DB', 'planner.db'))
+        # Все фоновые потоки обращаются к интерфейсу только через эту очередь
+        self.dispatcher = UiDispatcher(self.root)
+        self.loader = BackgroundLoader(self.dispatcher)
         
         self.selected_date = datetime.now().strftime('%Y-%m-%d')
         self.start_time = "09:00"  
         self.notification_sound = True  
         self.active_notification = None  
-        self.sound_thread = None  
-        self.sound_flag = False  
+        self.sound = SoundPlayer()
         
         self.create_widgets()
         self.update_task_list()
         
-        self.notification_thread = threading.Thread(target=self.check_notifications, daemon=True)
-        self.notification_thread.start()
+        self.notifier = NotificationScheduler(
+            self.db,
+            lambda: self.start_time,
+            lambda title, message, task_id: self.dispatcher.post(
+                self.show_notification, title, message, key=('notification', task_id)
+            )
+        )
+        self.notifier.start()
     
     def setup_style(self):
         style = ttk.Style()
@@ -73,13 +94,20 @@ class ModernPlanner:
         self.start_time_entry.pack(side=tk.LEFT, padx=5)
         self.start_time_entry.insert(0, self.start_time)
         self.start_time_entry.bind("<FocusOut>", lambda e: self.validate_start_time())
+        
+        self.status_label = ttk.Label(date_frame, text="")
+        self.status_label.pack(side=tk.LEFT, padx=5)
 
         ttk.Button(button_frame, text="Добавить", command=self.add_task).pack(side=tk.LEFT, padx=2)
         ttk.Button(button_frame, text="Редактировать", command=self.edit_task).pack(side=tk.LEFT, padx=2)
         ttk.Button(button_frame, text="Удалить", command=self.delete_task).pack(side=tk.LEFT, padx=2)
         ttk.Button(button_frame, text="Очистить все", command=self.clear_all).pack(side=tk.LEFT, padx=2)
         ttk.Button(button_frame, text="Календарь", command=self.show_calendar).pack(side=tk.LEFT, padx=2)
+        ttk.Button(button_frame, text="Импорт", command=self.import_from_file).pack(side=tk.LEFT, padx=2)
+        ttk.Button(button_frame, text="Поиск", command=self.show_search).pack(side=tk.LEFT, padx=2)
+        self.root.bind('<Control-f>', lambda e: self.show_search())
         ttk.Button(button_frame, text="Сгенерировать", command=self.generate_schedule).pack(side=tk.RIGHT, padx=2)
+        ttk.Button(button_frame, text="На неделю", command=self.plan_week).pack(side=tk.RIGHT, padx=2)
         ttk.Button(button_frame, text="Показать расписание", command=self.show_day_schedule).pack(side=tk.RIGHT, padx=2)
 
         self.sound_btn = ttk.Button(button_frame, text="🔔 Звук Вкл", command=self.toggle_sound)
@@ -104,6 +132,32 @@ class ModernPlanner:
         ttk.Label(input_frame, text="Длительность (мин):").grid(row=2, column=0, sticky='e', padx=5, pady=2)
         self.duration_entry = ttk.Entry(input_frame, width=10)
         self.duration_entry.grid(row=2, column=1, sticky='w', padx=5, pady=2)
+        
+        # Необязательные ограничения для планировщика
+        ttk.Label(input_frame, text="Не раньше (ЧЧ:ММ):").grid(row=0, column=2, sticky='e', padx=5, pady=2)
+        self.earliest_entry = ttk.Entry(input_frame, width=8)
+        self.earliest_entry.grid(row=0, column=3, sticky='w', padx=5, pady=2)
+        
+        ttk.Label(input_frame, text="Срок (ЧЧ:ММ):").grid(row=1, column=2, sticky='e', padx=5, pady=2)
+        self.deadline_entry = ttk.Entry(input_frame, width=8)
+        self.deadline_entry.grid(row=1, column=3, sticky='w', padx=5, pady=2)
+        
+        ttk.Label(input_frame, text="Точное время (ЧЧ:ММ):").grid(row=2, column=2, sticky='e', padx=5, pady=2)
+        self.fixed_entry = ttk.Entry(input_frame, width=8)
+        self.fixed_entry.grid(row=2, column=3, sticky='w', padx=5, pady=2)
+        
+        # Повторяющаяся задача хранится одним правилом начиная с выбранной даты
+        ttk.Label(input_frame, text="Повтор:").grid(row=3, column=0, sticky='e', padx=5, pady=2)
+        self.repeat_var = tk.StringVar()
+        self.repeat_combo = ttk.Combobox(
+            input_frame,
+            textvariable=self.repeat_var,
+            values=["Нет"] + list(RECURRENCE_NAMES.values()),
+            state="readonly",
+            width=15
+        )
+        self.repeat_combo.grid(row=3, column=1, sticky='w', padx=5, pady=2)
+        self.repeat_combo.current(0)
 
         self.tree = ttk.Treeview(
             table_frame,
@@ -122,22 +176,45 @@ class ModernPlanner:
         self.tree.column('priority', width=200, anchor='center')
         self.tree.column('duration', width=200, anchor='center')
         
-        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.tree.pack(fill=tk.BOTH, expand=True)
         
         self.tree.bind('<Double-1>', self.on_double_click)
+        # В таблице только видимые строки (iid строки = str(id)), остальные читаются из базы при прокрутке
+        self.task_view = VirtualTree(
+            self.tree,
+            scrollbar,
+            lambda task: task.id,
+            lambda task: (task.id, task.name if task.recurrence_id is None else f"↻ {task.name}", task.priority, task.duration)
+        )
+        self.task_view_date = None
     
     def update_task_list(self):
-        self.tree.delete(*self.tree.get_children())
-        tasks = self.db.get_tasks_by_date(self.selected_date)
-        for task in tasks:
-            self.tree.insert(
-                '',
-                tk.END,
-                values=(task['id'], task['name'], task['priority'], task['duration'])
-            )
+        # Запрос идёт в фоне; если дату сменят раньше, чем он завершится, результат будет отброшен
+        date = self.selected_date
+        self.status_label.config(text="Загрузка...")
+        self.loader.submit(
+            'tasks',
+            lambda: (self.db.count_tasks_by_date(date), self.db.get_tasks_page(date, 0, PAGE_SIZE)),
+            lambda result: self.show_task_list(date, *result),
+            self.show_load_error
+        )
+    
+    def show_load_error(self, error):
+        self.status_label.config(text="")
+        messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {str(error)}")
+    
+    def show_task_list(self, date, total, first_page):
+        # Для той же даты сохраняем прокрутку и выделение, строки обновляются только видимые
+        self.status_label.config(text="")
+        self.task_view.set_source(
+            total,
+            lambda offset, limit: self.db.get_tasks_page(date, offset, limit),
+            first_page,
+            keep_position=(date == self.task_view_date)
+        )
+        self.task_view_date = date
     
     def add_task(self):
         self.select_date_manually()
@@ -158,13 +235,32 @@ class ModernPlanner:
         if not self.check_time_limit(duration):
             messagebox.showwarning("Ошибка", "Расписание выходит за пределы дня (после 23:59)")
             return
-            
-        self.db.add_task(
-            name=self.task_entry.get(),
-            priority=self.priority_var.get(),
-            duration=duration,
-            date=self.selected_date
-        )
+        
+        constraints = self.read_constraints(self.earliest_entry.get(), self.deadline_entry.get(), self.fixed_entry.get(), duration)
+        if constraints is None:
+            return
+        
+        rules = {name: rule for rule, name in RECURRENCE_NAMES.items()}
+        rule = rules.get(self.repeat_var.get())
+        if rule:
+            self.db.add_recurrence(
+                name=self.task_entry.get(),
+                priority=self.priority_var.get(),
+                duration=duration,
+                rule=rule,
+                start_date=self.selected_date,
+                **constraints
+            )
+            self.notifier.invalidate()
+        else:
+            self.db.add_task(
+                name=self.task_entry.get(),
+                priority=self.priority_var.get(),
+                duration=duration,
+                date=self.selected_date,
+                **constraints
+            )
+            self.notifier.invalidate(self.selected_date)
         
         self.update_task_list()
         self.clear_inputs()
@@ -178,24 +274,28 @@ class ModernPlanner:
             return
             
         item = self.tree.item(selected[0])
-        task_id = item['values'][0]
-        task = self.db.get_task_by_id(task_id)
+        task_id = int(item['values'][0])
+        if task_id < 0:
+            task = self.db.get_occurrence(-task_id, self.task_view_date)
+        else:
+            task = self.db.get_task_by_id(task_id)
         
         if not task:
             messagebox.showerror("Ошибка", "Задача не найдена")
             return
+        recurrence_id = task.recurrence_id
             
         edit_dialog = tk.Toplevel(self.root)
-        edit_dialog.title("Редактирование задачи")
+        edit_dialog.title("Редактирование задачи" if recurrence_id is None else "Редактирование повторяющейся задачи")
         edit_dialog.resizable(False, False)
         
         ttk.Label(edit_dialog, text="Название задачи:").grid(row=0, column=0, padx=5, pady=5, sticky='e')
         name_entry = ttk.Entry(edit_dialog, width=30)
         name_entry.grid(row=0, column=1, padx=5, pady=5)
-        name_entry.insert(0, task['name'])
+        name_entry.insert(0, task.name)
         
         ttk.Label(edit_dialog, text="Приоритет:").grid(row=1, column=0, padx=5, pady=5, sticky='e')
-        priority_var = tk.StringVar(value=task['priority'])
+        priority_var = tk.StringVar(value=task.priority)
         priority_combo = ttk.Combobox(
             edit_dialog,
             textvariable=priority_var,
@@ -208,12 +308,26 @@ class ModernPlanner:
         ttk.Label(edit_dialog, text="Длительность (мин):").grid(row=2, column=0, padx=5, pady=5, sticky='e')
         duration_entry = ttk.Entry(edit_dialog, width=10)
         duration_entry.grid(row=2, column=1, padx=5, pady=5, sticky='w')
-        duration_entry.insert(0, str(task['duration']))
+        duration_entry.insert(0, str(task.duration))
         
         ttk.Label(edit_dialog, text="Дата (ГГГГ-ММ-ДД):").grid(row=3, column=0, padx=5, pady=5, sticky='e')
         date_entry = ttk.Entry(edit_dialog, width=15)
         date_entry.grid(row=3, column=1, padx=5, pady=5, sticky='w')
-        date_entry.insert(0, task['date'])
+        date_entry.insert(0, task.date)
+        if recurrence_id is not None:
+            # Изменения относятся ко всем повторениям, дата задаётся правилом
+            date_entry.config(state='disabled')
+        
+        constraint_entries = []
+        for row, (label, value) in enumerate([("Не раньше (ЧЧ:ММ):", task.earliest),
+                                              ("Срок (ЧЧ:ММ):", task.deadline),
+                                              ("Точное время (ЧЧ:ММ):", task.fixed_start)], start=4):
+            ttk.Label(edit_dialog, text=label).grid(row=row, column=0, padx=5, pady=5, sticky='e')
+            entry = ttk.Entry(edit_dialog, width=8)
+            entry.grid(row=row, column=1, padx=5, pady=5, sticky='w')
+            if value is not None:
+                entry.insert(0, format_time(value))
+            constraint_entries.append(entry)
         
         def save_changes():
             try:
@@ -222,25 +336,51 @@ class ModernPlanner:
                 messagebox.showwarning("Ошибка", "Длительность должна быть числом")
                 return
             
-            tasks = self.db.get_tasks_by_date(self.selected_date)
-            current_total = sum(t['duration'] for t in tasks if t['id'] != task_id)
-            if (current_total + new_duration) > 1440:
+            try:
+                new_date = normalize_date(date_entry.get())
+            except ValueError:
+                messagebox.showerror("Ошибка", "Неверный формат даты. Используйте ГГГГ-ММ-ДД")
+                return
+            
+            # Итоги целевой даты; если дата не меняется, сама задача в них уже учтена
+            moved = new_date != task.date
+            duration_delta = new_duration if moved else new_duration - task.duration
+            new_tasks = 1 if moved else 0
+            
+            if not self.check_total_duration(duration_delta, new_date):
                 messagebox.showwarning("Ошибка", "Общая длительность задач не может превышать 24 часа (1440 минут)")
                 return
 
-            if not self.check_time_limit(new_duration - task['duration']):
+            if not self.check_time_limit(duration_delta, new_tasks, new_date):
                 messagebox.showwarning("Ошибка", "Расписание выходит за пределы дня (после 23:59)")
                 return
             
-            self.db.update_task(
-                task_id=task_id,
-                name=name_entry.get(),
-                priority=priority_var.get(),
-                duration=new_duration,
-                date=date_entry.get()
-            )
+            constraints = self.read_constraints(*(entry.get() for entry in constraint_entries), new_duration)
+            if constraints is None:
+                return
+            
+            if recurrence_id is not None:
+                self.db.update_recurrence(
+                    recurrence_id=recurrence_id,
+                    name=name_entry.get(),
+                    priority=priority_var.get(),
+                    duration=new_duration,
+                    **constraints
+                )
+                self.notifier.invalidate()
+            else:
+                self.db.update_task(
+                    task_id=task_id,
+                    name=name_entry.get(),
+                    priority=priority_var.get(),
+                    duration=new_duration,
+                    date=new_date,
+                    **constraints
+                )
+                self.notifier.invalidate(task.date)
+                self.notifier.invalidate(new_date)
             
-            self.selected_date = date_entry.get()
+            self.selected_date = new_date
             self.date_entry.delete(0, tk.END)
             self.date_entry.insert(0, self.selected_date)
             
@@ -250,15 +390,20 @@ class ModernPlanner:
             self.play_notification_sound()
         
         def delete_task():
+            if recurrence_id is not None:
+                if self.delete_occurrence(task):
+                    edit_dialog.destroy()
+                return
             if messagebox.askyesno("Подтверждение", "Вы действительно хотите удалить эту задачу?"):
                 self.db.delete_task(task_id)
+                self.notifier.invalidate(task.date)
                 self.update_task_list()
                 edit_dialog.destroy()
                 messagebox.showinfo("Удалено", "Задача удалена")
                 self.play_notification_sound()
         
         btn_frame = ttk.Frame(edit_dialog)
-        btn_frame.grid(row=4, columnspan=2, pady=10)
+        btn_frame.grid(row=7, columnspan=2, pady=10)
         
         ttk.Button(btn_frame, text="Сохранить", command=save_changes).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Удалить", command=delete_task).pack(side=tk.LEFT, padx=5)
@@ -274,64 +419,108 @@ class ModernPlanner:
             return
             
         item = self.tree.item(selected[0])
-        task_id = item['values'][0]
+        task_id = int(item['values'][0])
+        if task_id < 0:
+            task = self.db.get_occurrence(-task_id, self.task_view_date)
+            if task:
+                self.delete_occurrence(task)
+            return
         
         if messagebox.askyesno("Подтверждение", "Вы действительно хотите удалить выбранную задачу?"):
             self.db.delete_task(task_id)
+            self.notifier.invalidate(self.selected_date)
             self.update_task_list()
             messagebox.showinfo("Удалено", "Задача удалена")
             self.play_notification_sound()
     
+    def delete_occurrence(self, task):
+        answer = messagebox.askyesnocancel(
+            "Подтверждение",
+            f"Задача «{task.name}» повторяется ({RECURRENCE_NAMES[self.db.get_recurrence(task.recurrence_id)['rule']].lower()}).\n\n"
+            "Да - удалить только это повторение\nНет - удалить все повторения начиная с этой даты"
+        )
+        if answer is None:
+            return False
+        if answer:
+            self.db.skip_occurrence(task.recurrence_id, task.date)
+        else:
+            self.db.end_recurrence(task.recurrence_id, task.date)
+        self.notifier.invalidate()
+        self.update_task_list()
+        messagebox.showinfo("Удалено", "Повторение удалено" if answer else "Повторения удалены")
+        self.play_notification_sound()
+        return True
+    
     def clear_all(self):
         if not messagebox.askyesno("Подтверждение", "Вы действительно хотите удалить все задачи на выбранную дату?"):
             return
             
-        tasks = self.db.get_tasks_by_date(self.selected_date)
-        for task in tasks:
-            self.db.delete_task(task['id'])
+        deleted = self.db.delete_tasks_by_date(self.selected_date)
+        self.notifier.invalidate(self.selected_date)
             
         self.update_task_list()
-        messagebox.showinfo("Успех", "Все задачи удалены")
+        messagebox.showinfo("Успех", f"Удалено задач: {deleted}")
         self.play_notification_sound()
 
+    def import_from_file(self):
+        path = filedialog.askopenfilename(
+            title="Импорт задач",
+            filetypes=[("Все поддерживаемые", "*.csv *.json *.jsonl *.ics"), ("CSV", "*.csv"),
+                       ("JSON", "*.json *.jsonl"), ("iCalendar", "*.ics")]
+        )
+        if not path:
+            return
+        
+        start = parse_time(self.start_time)
+        self.status_label.config(text="Импорт...")
+        self.loader.submit('import', lambda: import_file(self.db, path, start=start), self.show_import_result, self.show_load_error)
+    
+    def show_import_result(self, result):
+        self.status_label.config(text="")
+        self.notifier.invalidate()
+        self.update_task_list()
+        
+        message = f"Импортировано задач: {result['imported']}"
+        errors = result['errors']
+        if not errors:
+            messagebox.showinfo("Импорт", message)
+        else:
+            lines = [f"Запись {number}: {text}" for number, text in errors[:10]]
+            if len(errors) > 10:
+                lines.append(f"... и ещё {len(errors) - 10}")
+            messagebox.showwarning("Импорт", f"{message}\nОшибок: {len(errors)}\n\n" + "\n".join(lines))
+        self.play_notification_sound()
+    
     def generate_schedule(self):
+        date = self.selected_date
+        self.status_label.config(text="Загрузка...")
+        self.loader.submit(
+            'generate',
+            lambda: self.db.get_tasks_by_date(date),
+            lambda date_tasks: self.show_generated_schedule(date, date_tasks),
+            self.show_load_error
+        )
+    
+    def show_generated_schedule(self, date, date_tasks):
+        self.status_label.config(text="")
         try:
-            date_tasks = self.db.get_tasks_by_date(self.selected_date)
-            
             if not date_tasks:
-                messagebox.showwarning("Ошибка", f"Нет задач на выбранную дату {self.selected_date}")
+                messagebox.showwarning("Ошибка", f"Нет задач на выбранную дату {date}")
                 return
                 
-            priority_order = {"Высокий": 1, "Средний": 2, "Низкий": 3}
-            sorted_tasks = sorted(date_tasks, key=lambda x: priority_order[x['priority']])
-            
-            try:
-                current_time = datetime.strptime(self.start_time, "%H:%M")
-            except ValueError:
-                current_time = datetime.strptime("09:00", "%H:%M")
-            
-            schedule = f"=== Расписание на {self.selected_date} ===\n\n"
-            schedule += f"Начало дня: {current_time.strftime('%H:%M')}\n\n"
-            
-            for task in sorted_tasks:
-                duration = timedelta(minutes=task['duration'])
-                end_time = current_time + duration
-                
-                if end_time.hour >= 24:
-                    messagebox.showwarning("Ошибка", "Расписание выходит за пределы дня (после 23:59)")
-                    return
-                
-                schedule += f"{current_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}\n"
-                schedule += f"  • {task['name']}\n"
-                schedule += f"  • Приоритет: {task['priority']}\n"
-                schedule += f"  • Длительность: {task['duration']} мин\n\n"
-                
-                current_time = end_time + timedelta(minutes=10)
+            start = parse_time(self.start_time)
+            slots, unscheduled = plan_schedule(date_tasks, start)
+            if not slots:
+                messagebox.showwarning("Ошибка", "Ни одна задача не помещается в день (до 23:59)")
+                return
             
             result_window = tk.Toplevel(self.root)
             result_window.title("Сгенерированное расписание")
             result_window.geometry("500x600")
             
+            export_btn = ttk.Button(result_window, text="💾 Экспорт", command=lambda: self.export_schedule(date, slots, start))
+            export_btn.pack(side=tk.BOTTOM, pady=(0, 10))
+            
             text_frame = ttk.Frame(result_window)
             text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
             
@@ -342,7 +531,11 @@ class ModernPlanner:
             scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
             text.pack(fill=tk.BOTH, expand=True)
             
-            text.insert(tk.END, schedule)
+            write_report(SimpleNamespace(write=lambda chunk: text.insert(tk.END, chunk)), [(date, slots)], start=start)
+            if unscheduled:
+                text.insert(tk.END, f"=== Не поместились ({len(unscheduled)}) ===\n\n")
+                for task in unscheduled:
+                    text.insert(tk.END, f"  • {task.name} ({task.priority}, {task.duration} мин)\n")
             text.config(state=tk.DISABLED)
             
             self.play_notification_sound()
@@ -350,6 +543,89 @@ class ModernPlanner:
         except Exception as e:
             messagebox.showerror("Ошибка", f"Произошла ошибка при генерации расписания: {str(e)}")
     
+    def plan_week(self):
+        # Неделя от выбранной даты: что не помещается в день, переносится на следующий
+        first = datetime.strptime(self.selected_date, "%Y-%m-%d").date()
+        dates = [(first + timedelta(days=offset)).isoformat() for offset in range(7)]
+        start = parse_time(self.start_time)
+        self.status_label.config(text="Загрузка...")
+        self.loader.submit(
+            'week',
+            lambda: self.plan_range(dates, start),
+            lambda result: self.show_week_plan(result, start),
+            self.show_load_error
+        )
+    
+    def plan_range(self, dates, start):
+        # Выполняется в фоне: планы по дням и то, что не поместилось во весь диапазон
+        leftovers = []
+        plans = list(plan_days(each_day(dates, self.db.iter_tasks_by_range(dates[0], dates[-1])), start, leftovers=leftovers))
+        return plans, leftovers
+    
+    def show_week_plan(self, result, start):
+        self.status_label.config(text="")
+        plans, leftovers = result
+        moves = [move for date, plan in plans for move in rolled_over(date, plan)]
+        if not moves and not any(plan.slots for date, plan in plans):
+            messagebox.showwarning("Ошибка", f"Нет задач с {plans[0][0]} по {plans[-1][0]}")
+            return
+        
+        week_window = tk.Toplevel(self.root)
+        week_window.title(f"План на неделю с {plans[0][0]}")
+        week_window.geometry("500x600")
+        
+        def apply_moves():
+            self.db.move_tasks(moves)
+            self.notifier.invalidate()
+            self.update_task_list()
+            week_window.destroy()
+            messagebox.showinfo("Успех", f"Перенесено задач: {len(moves)}")
+        
+        apply_btn = ttk.Button(week_window, text=f"Перенести задачи ({len(moves)})", command=apply_moves)
+        apply_btn.pack(side=tk.BOTTOM, pady=(0, 10))
+        if not moves:
+            apply_btn.config(state=tk.DISABLED)
+        
+        text_frame = ttk.Frame(week_window)
+        text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        text = tk.Text(text_frame, wrap=tk.WORD, font=('Helvetica', 10))
+        scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=text.yview)
+        text.configure(yscrollcommand=scrollbar.set)
+        
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        text.pack(fill=tk.BOTH, expand=True)
+        
+        write_report(SimpleNamespace(write=lambda chunk: text.insert(tk.END, chunk)),
+                     ((date, plan.slots) for date, plan in plans), start=start)
+        if leftovers:
+            text.insert(tk.END, f"\n=== Не поместились в неделю ({len(leftovers)}) ===\n\n")
+            for task in leftovers:
+                text.insert(tk.END, f"  • {task.name} ({task.date}, {task.priority}, {task.duration} мин)\n")
+        text.config(state=tk.DISABLED)
+        
+        self.play_notification_sound()
+    
+    def export_schedule(self, date, slots, start):
+        path = filedialog.asksaveasfilename(
+            title="Экспорт расписания",
+            initialfile=f"schedule_{date}",
+            defaultextension=".ics",
+            filetypes=[("iCalendar", "*.ics"), ("CSV", "*.csv"), ("JSON", "*.json"),
+                       ("JSON lines", "*.jsonl"), ("Текст", "*.txt")]
+        )
+        if not path:
+            return
+        
+        format = EXTENSIONS.get(os.path.splitext(path)[1].lower(), 'text')
+        try:
+            with open(path, 'w', encoding='utf-8', newline='') as file:
+                write_report(file, [(date, slots)], format, start)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить файл: {str(e)}")
+            return
+        self.status_label.config(text=f"Расписание сохранено: {os.path.basename(path)}")
+    
     def toggle_sound(self):
         self.notification_sound = not self.notification_sound
         if self.notification_sound:
@@ -358,19 +634,8 @@ class ModernPlanner:
             self.sound_btn.config(text="🔕 Звук Выкл")
             self.stop_sound()
     
-    def play_continuous_sound(self):
-        self.sound_flag = True
-        while self.sound_flag and self.notification_sound:
-            try:
-                winsound.Beep(1000, 500) 
-                time.sleep(0.5) 
-            except:
-                break
-    
     def stop_sound(self):
-        self.sound_flag = False
-        if self.sound_thread and self.sound_thread.is_alive():
-            self.sound_thread.join()
+        self.sound.stop()
     
     def show_notification(self, title, message):
         if self.active_notification:
@@ -392,8 +657,7 @@ class ModernPlanner:
         self.active_notification = notification
         
         if self.notification_sound:
-            self.sound_thread = threading.Thread(target=self.play_continuous_sound, daemon=True)
-            self.sound_thread.start()
+            self.sound.start_alarm()
     
     def close_notification(self, notification):
         self.stop_sound()
@@ -401,83 +665,139 @@ class ModernPlanner:
         if notification == self.active_notification:
             self.active_notification = None
     
-    def check_notifications(self):
-        while True:
-            now = datetime.now()
-            current_time = now.strftime("%H:%M")
-            current_date = now.strftime("%Y-%m-%d")
-            
-            tasks = self.db.get_tasks_by_date(current_date)
-            if tasks:
-                try:
-                    start_time = datetime.strptime(self.start_time, "%H:%M")
-                except ValueError:
-                    start_time = datetime.strptime("09:00", "%H:%M")
-                
-                current_datetime = datetime.strptime(current_time, "%H:%M")
-                current_total_minutes = current_datetime.hour * 60 + current_datetime.minute
-                
-                for task in tasks:
-                    task_start = start_time
-                    task_end = task_start + timedelta(minutes=task['duration'])
-                    
-                    reminder_time = task_start - timedelta(minutes=5)
-                    reminder_minutes = reminder_time.hour * 60 + reminder_time.minute
-                    
-                    task_start_minutes = task_start.hour * 60 + task_start.minute
-                    
-                    if current_total_minutes == reminder_minutes:
-                        self.show_notification(
-                            "Напоминание", 
-                            f"Через 5 минут начинается задача: {task['name']}\n"
-                            f"Время: {task_start.strftime('%H:%M')} - {task_end.strftime('%H:%M')}\n"
-                            f"Приоритет: {task['priority']}"
-                        )
-                    elif current_total_minutes == task_start_minutes:
-                        self.show_notification(
-                            "Начало задачи", 
-                            f"Сейчас начинается задача: {task['name']}\n"
-                            f"Время: {task_start.strftime('%H:%M')} - {task_end.strftime('%H:%M')}\n"
-                            f"Приоритет: {task['priority']}"
-                        )
-                    
-                    start_time = task_end + timedelta(minutes=10)
-            
-            time.sleep(30) 
-    
     def validate_start_time(self):
         time_str = self.start_time_entry.get()
         try:
             datetime.strptime(time_str, '%H:%M')
-            self.start_time = time_str
+            if time_str != self.start_time:
+                self.start_time = time_str
+                self.notifier.invalidate()
         except ValueError:
             messagebox.showerror("Ошибка", "Неверный формат времени. Используйте ЧЧ:ММ")
             self.start_time_entry.delete(0, tk.END)
             self.start_time_entry.insert(0, self.start_time)
     
-    def check_total_duration(self, new_duration=0):
-        tasks = self.db.get_tasks_by_date(self.selected_date)
-        total = sum(task['duration'] for task in tasks)
-        return (total + new_duration) <= 1440 
+    def read_constraints(self, earliest_text, deadline_text, fixed_text, duration):
+        # Пустое поле - ограничения нет; при ошибке показываем предупреждение и возвращаем None
+        constraints = {}
+        for key, text, label in [('earliest', earliest_text, "Не раньше"),
+                                 ('deadline', deadline_text, "Срок"),
+                                 ('fixed_start', fixed_text, "Точное время")]:
+            text = text.strip()
+            if not text:
+                constraints[key] = None
+                continue
+            constraints[key] = parse_time(text, None)
+            if constraints[key] is None:
+                messagebox.showwarning("Ошибка", f"Неверное значение поля «{label}». Используйте ЧЧ:ММ")
+                return None
+        
+        error = check_constraints(duration, **constraints)
+        if error:
+            messagebox.showwarning("Ошибка", error)
+            return None
+        return constraints
+    
+    def check_total_duration(self, new_duration=0, date=None):
+        summary = self.db.get_day_summary(date or self.selected_date)
+        return (summary['duration'] + new_duration) <= DAY_MINUTES
     
-    def check_time_limit(self, new_duration=0):
-        tasks = self.db.get_tasks_by_date(self.selected_date)
+    def check_time_limit(self, new_duration=0, new_tasks=1, date=None):
+        summary = self.db.get_day_summary(date or self.selected_date)
+        end = day_end(parse_time(self.start_time), summary['count'] + new_tasks, summary['duration'] + new_duration)
+        return end <= DAY_MINUTES
+    
+    def show_search(self):
+        search_window = tk.Toplevel(self.root)
+        search_window.title("Поиск задач")
+        search_window.geometry("700x450")
         
-        try:
-            start_time = datetime.strptime(self.start_time, "%H:%M")
-        except ValueError:
-            start_time = datetime.strptime("09:00", "%H:%M")
+        search_frame = ttk.Frame(search_window)
+        search_frame.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Label(search_frame, text="Название:").pack(side=tk.LEFT, padx=5)
+        search_entry = ttk.Entry(search_frame, width=50)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        search_entry.focus_set()
+        
+        more_btn = ttk.Button(search_window, text="Показать ещё", state=tk.DISABLED)
+        more_btn.pack(side=tk.BOTTOM, pady=(0, 10))
+        
+        table_frame = ttk.Frame(search_window)
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        
+        results_tree = ttk.Treeview(table_frame, columns=('date', 'name', 'priority', 'duration'), show='headings', selectmode='browse')
+        results_tree.heading('date', text='Дата')
+        results_tree.heading('name', text='Название задачи')
+        results_tree.heading('priority', text='Приоритет')
+        results_tree.heading('duration', text='Длительность (мин)')
+        results_tree.column('date', width=100, anchor='center')
+        results_tree.column('name', width=330, anchor='w')
+        results_tree.column('priority', width=100, anchor='center')
+        results_tree.column('duration', width=120, anchor='center')
+        
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=results_tree.yview)
+        results_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        results_tree.pack(fill=tk.BOTH, expand=True)
+        
+        # Страницы идут от новых задач к старым, следующая начинается после последнего показанного id
+        state = {'text': '', 'last_id': None, 'after': None}
+        
+        def load(append):
+            text = state['text']
+            before_id = state['last_id'] if append else None
+            self.loader.submit(
+                'search',
+                lambda: self.db.search_tasks(text, SEARCH_PAGE + 1, before_id),
+                lambda tasks: show_results(tasks, append),
+                self.show_load_error
+            )
+        
+        def show_results(tasks, append):
+            if not search_window.winfo_exists():
+                return
+            if not append:
+                results_tree.delete(*results_tree.get_children())
+            for task in tasks[:SEARCH_PAGE]:
+                results_tree.insert('', tk.END, iid=str(task.id), values=(task.date, task.name, task.priority, task.duration))
+            state['last_id'] = tasks[min(len(tasks), SEARCH_PAGE) - 1].id if tasks else state['last_id']
+            more_btn.config(state=tk.NORMAL if len(tasks) > SEARCH_PAGE else tk.DISABLED)
+        
+        def start_search():
+            state['after'] = None
+            text = search_entry.get().strip()
+            if text != state['text']:
+                state['text'] = text
+                state['last_id'] = None
+                load(False)
         
-        total_duration = sum(task['duration'] for task in tasks) + new_duration
-        total_minutes = (start_time.hour * 60 + start_time.minute) + total_duration + (len(tasks) * 10) 
+        def on_key(event):
+            if state['after'] is not None:
+                search_window.after_cancel(state['after'])
+            state['after'] = search_window.after(SEARCH_DELAY_MS, start_search)
         
-        return total_minutes <= 1440 
+        def open_task(event):
+            selected = results_tree.selection()
+            if not selected:
+                return
+            self.selected_date = results_tree.item(selected[0])['values'][0]
+            self.date_entry.delete(0, tk.END)
+            self.date_entry.insert(0, self.selected_date)
+            self.update_task_list()
+            search_window.destroy()
+        
+        search_entry.bind('<KeyRelease>', on_key)
+        search_entry.bind('<Return>', lambda e: start_search())
+        results_tree.bind('<Double-1>', open_task)
+        results_tree.bind('<Return>', open_task)
+        more_btn.config(command=lambda: load(True))
     
     def select_date_manually(self, event=None):
         date_str = self.date_entry.get()
         try:
-            datetime.strptime(date_str, '%Y-%m-%d')
-            self.selected_date = date_str
+            self.selected_date = normalize_date(date_str)
+            self.date_entry.delete(0, tk.END)
+            self.date_entry.insert(0, self.selected_date)
             self.update_task_list()
         except ValueError:
             messagebox.showerror("Ошибка", "Неверный формат даты. Используйте ГГГГ-ММ-ДД")
@@ -497,6 +817,8 @@ class ModernPlanner:
         
         ttk.Button(control_frame, text="Тест звука", command=lambda: self.show_notification("Тест", "Это тестовое уведомление")).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_frame, text="Закрыть", command=day_window.destroy).pack(side=tk.RIGHT, padx=5)
+        info_label = ttk.Label(control_frame, text="")
+        info_label.pack(side=tk.LEFT, padx=5)
 
         schedule_tree = ttk.Treeview(
             day_window,
@@ -515,48 +837,48 @@ class ModernPlanner:
         schedule_tree.column("priority", width=150, anchor="center")
         schedule_tree.column("duration", width=150, anchor="center")
         
-        scrollbar = ttk.Scrollbar(day_window, orient=tk.VERTICAL, command=schedule_tree.yview)
-        schedule_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(day_window, orient=tk.VERTICAL)
         
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         schedule_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
-
-        date_tasks = self.db.get_tasks_by_date(date_str)
         
-        if not date_tasks:
+        schedule_view = VirtualTree(
+            schedule_tree,
+            scrollbar,
+            lambda slot: slot.task.id,
+            lambda slot: (
+                f"{format_time(slot.start)} - {format_time(slot.end)}",
+                slot.task.name,
+                slot.task.priority,
+                slot.task.duration
+            )
+        )
+        
+        schedule_tree.insert("", "end", iid="loading", values=("", "Загрузка...", "", ""))
+        load_key = ('day_schedule', str(day_window))
+        day_window.bind("<Destroy>", lambda e: self.loader.cancel(load_key) if e.widget is day_window else None)
+        start = parse_time(self.start_time)
+        self.loader.submit(
+            load_key,
+            lambda: plan_schedule(self.db.get_tasks_by_date(date_str), start),
+            lambda plan: self.fill_day_schedule(day_window, schedule_tree, schedule_view, info_label, date_str, plan),
+            self.show_load_error
+        )
+    
+    def fill_day_schedule(self, day_window, schedule_tree, schedule_view, info_label, date_str, plan):
+        schedule_tree.delete("loading")
+        
+        if not plan.slots and not plan.unscheduled:
             messagebox.showinfo("Информация", f"Нет задач на выбранную дату {date_str}")
             day_window.destroy()
             return
         
-        priority_order = {"Высокий": 1, "Средний": 2, "Низкий": 3}
-        sorted_tasks = sorted(date_tasks, key=lambda x: priority_order[x['priority']])
-        
-        try:
-            current_time = datetime.strptime(self.start_time, "%H:%M")
-        except ValueError:
-            current_time = datetime.strptime("09:00", "%H:%M")
+        if plan.unscheduled:
+            info_label.config(text=f"Не поместились задачи: {len(plan.unscheduled)}")
         
-        for task in sorted_tasks:
-            duration = timedelta(minutes=task['duration'])
-            end_time = current_time + duration
-            
-            if end_time.hour == 0 and end_time.minute == 0:
-                end_time_str = "00:00"
-            elif end_time.hour >= 24:
-                messagebox.showwarning("Ошибка", "Расписание выходит за пределы дня (после 23:59)")
-                day_window.destroy()
-                return
-            
-            time_str = f"{current_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}"
-            
-            schedule_tree.insert("", "end", values=(
-                time_str,
-                task['name'],
-                task['priority'],
-                task['duration']
-            ))
-            
-            current_time = end_time + timedelta(minutes=10)
+        # Расписание уже посчитано в фоне; таблица берёт из него только видимые строки
+        slots = plan.slots
+        schedule_view.set_source(len(slots), lambda offset, limit: slots[offset:offset + limit])
     
     def validate_input(self):
         if not self.task_entry.get():
@@ -576,7 +898,11 @@ class ModernPlanner:
     def clear_inputs(self):
         self.task_entry.delete(0, tk.END)
         self.duration_entry.delete(0, tk.END)
+        self.earliest_entry.delete(0, tk.END)
+        self.deadline_entry.delete(0, tk.END)
+        self.fixed_entry.delete(0, tk.END)
         self.priority_combo.current(1)
+        self.repeat_combo.current(0)
     
     def show_calendar(self):
         calendar_window = tk.Toplevel(self.root)
@@ -598,6 +924,9 @@ class ModernPlanner:
 
         self.calendar_frame = ttk.Frame(calendar_window)
         self.calendar_frame.pack(pady=10)
+        
+        self.create_calendar_tooltip(calendar_window)
+        self.create_calendar_grid(calendar_window)
 
         self.render_calendar(calendar_window)
     
@@ -617,70 +946,116 @@ class ModernPlanner:
         self.month_var.set(new_month)
         self.render_calendar(window)
     
-    def render_calendar(self, window):
-        for widget in self.calendar_frame.winfo_children():
-            widget.destroy()
-
-        year = self.year_var.get()
-        month = self.month_var.get()
-        self.month_label.config(text=f"{calendar.month_name[month]} {year}")
-
+    def create_calendar_grid(self, window):
+        # Сетка 7×6 создаётся один раз, при смене месяца меняются только текст, цвет и даты ячеек
         headers = ["№", "ПН", "ВТ", "СР", "ЧТ", "ПТ", "СБ", "ВС"]
         for col, header in enumerate(headers):
             ttk.Label(self.calendar_frame, text=header, borderwidth=1, relief="solid", 
                      padding=3, background="#f0f0f0", font=('Helvetica', 9, 'bold')).grid(
                      row=0, column=col, sticky="nsew", padx=1, pady=1)
-
-        month_calendar = calendar.monthcalendar(year, month)
         
-        for week_num, week in enumerate(month_calendar, start=1):
-            ttk.Label(self.calendar_frame, text=str(week_num), borderwidth=1, relief="solid",
-                     padding=3, background="#f0f0f0").grid(
-                     row=week_num, column=0, sticky="nsew", padx=1, pady=1)
+        self.calendar_week_labels = []
+        self.calendar_cells = []
+        self.calendar_cell_dates = {}
+        
+        for week_num in range(1, 7):
+            week_label = ttk.Label(self.calendar_frame, text=str(week_num), borderwidth=1, relief="solid",
+                                   padding=3, background="#f0f0f0")
+            week_label.grid(row=week_num, column=0, sticky="nsew", padx=1, pady=1)
+            self.calendar_week_labels.append(week_label)
             
-            for day_num, day in enumerate(week, start=1):
-                if day == 0:
-                    continue
-                    
-                date_str = f"{year:04d}-{month:02d}-{day:02d}"
-                day_tasks = self.db.get_tasks_by_date(date_str)
-                has_tasks = len(day_tasks) > 0
-                
-                bg_color = "#ffffff"
-                if has_tasks:
-                    priorities = [task['priority'] for task in day_tasks]
-                    if "Высокий" in priorities:
-                        bg_color = "#ffcccc"
-                    elif "Средний" in priorities:
-                        bg_color = "#ffffcc"
-                    else:
-                        bg_color = "#ccffcc"
-                
+            week_cells = []
+            for day_num in range(1, 8):
                 day_label = ttk.Label(
                     self.calendar_frame, 
-                    text=str(day),
+                    text="",
                     borderwidth=1,
                     relief="solid",
                     padding=3,
-                    background=bg_color,
+                    background="#ffffff",
                     anchor="center"
                 )
                 day_label.grid(row=week_num, column=day_num, sticky="nsew", padx=1, pady=1)
                 
-                if has_tasks:
-                    tooltip_text = "\n".join([f"• {task['name']}" for task in day_tasks[:3]])
-                    if len(day_tasks) > 3:
-                        tooltip_text += f"\n+{len(day_tasks)-3} ещё..."
-                    self.create_tooltip(day_label, tooltip_text)
-                
-                day_label.bind("<Double-1>", lambda e, d=day: self.on_day_double_click(year, month, d, window))
-                
-                day_label.bind("<Button-1>", lambda e, d=day: self.on_day_click(year, month, d))
-
+                day_label.bind("<Enter>", lambda e: self.on_calendar_cell_enter(e.widget))
+                day_label.bind("<Leave>", lambda e: self.hide_calendar_tooltip())
+                day_label.bind("<ButtonPress>", lambda e: self.hide_calendar_tooltip())
+                day_label.bind("<Double-1>", lambda e: self.on_calendar_cell_double_click(e.widget, window))
+                day_label.bind("<Button-1>", lambda e: self.on_calendar_cell_click(e.widget))
+                week_cells.append(day_label)
+            self.calendar_cells.append(week_cells)
+        
         for col in range(len(headers)):
             self.calendar_frame.grid_columnconfigure(col, weight=1, uniform="cal_col")
-        for row in range(len(month_calendar) + 1):
-            self.calendar_frame.grid_rowconfigure(row, weight=1, uniform="cal_row")
+        self.calendar_frame.grid_rowconfigure(0, weight=1, uniform="cal_row")
+    
+    def render_calendar(self, window):
+        self.hide_calendar_tooltip()
+
+        year = self.year_var.get()
+        month = self.month_var.get()
+        self.month_label.config(text=f"{calendar.month_name[month]} {year}")
+
+        month_calendar = calendar.monthcalendar(year, month)
+        
+        self.calendar_cell_dates = {}
+        for week_index, (week_label, week_cells) in enumerate(zip(self.calendar_week_labels, self.calendar_cells)):
+            if week_index >= len(month_calendar):
+                week_label.grid_remove()
+                for day_label in week_cells:
+                    day_label.grid_remove()
+                self.calendar_frame.grid_rowconfigure(week_index + 1, weight=0, uniform="")
+                continue
+            
+            week_label.grid()
+            self.calendar_frame.grid_rowconfigure(week_index + 1, weight=1, uniform="cal_row")
+            
+            for day_label, day in zip(week_cells, month_calendar[week_index]):
+                if day == 0:
+                    day_label.grid_remove()
+                    continue
+                    
+                day_label.configure(text=str(day), background="#ffffff")
+                day_label.grid()
+                self.calendar_cell_dates[day_label] = (year, month, day, False)
+        
+        # Сетка уже нарисована, цвета дней подгружаются в фоне
+        days_in_month = calendar.monthrange(year, month)[1]
+        self.loader.submit(
+            'calendar',
+            lambda: self.db.get_day_summaries(
+                f"{year:04d}-{month:02d}-01",
+                f"{year:04d}-{month:02d}-{days_in_month:02d}",
+                names_limit=0
+            ),
+            self.color_calendar,
+            self.show_load_error
+        )
+    
+    def color_calendar(self, summaries):
+        if not self.calendar_frame.winfo_exists():
+            return
+        for day_label, (year, month, day, _) in self.calendar_cell_dates.items():
+            summary = summaries.get(f"{year:04d}-{month:02d}-{day:02d}")
+            if summary:
+                day_label.configure(background=self.priority_colors[summary['top_priority']])
+                self.calendar_cell_dates[day_label] = (year, month, day, True)
+
+    def on_calendar_cell_click(self, cell):
+        if cell in self.calendar_cell_dates:
+            year, month, day, _ = self.calendar_cell_dates[cell]
+            self.on_day_click(year, month, day)
+    
+    def on_calendar_cell_double_click(self, cell, window):
+        if cell in self.calendar_cell_dates:
+            year, month, day, _ = self.calendar_cell_dates[cell]
+            self.on_day_double_click(year, month, day, window)
+    
+    def on_calendar_cell_enter(self, cell):
+        if cell in self.calendar_cell_dates:
+            year, month, day, has_tasks = self.calendar_cell_dates[cell]
+            if has_tasks:
+                self.show_calendar_tooltip(cell, f"{year:04d}-{month:02d}-{day:02d}")
 
     def on_day_click(self, year, month, day):
         self.selected_date = f"{year:04d}-{month:02d}-{day:02d}"
@@ -693,42 +1068,45 @@ class ModernPlanner:
         parent_window.destroy()
         self.show_day_schedule(date_str)
 
-    def create_tooltip(self, widget, text):
-        tooltip = tk.Toplevel(widget)
-        tooltip.wm_overrideredirect(True)
-        tooltip.wm_geometry("+0+0")
-        tooltip.withdraw()
-        
-        label = ttk.Label(
-            tooltip, 
-            text=text, 
+    def create_calendar_tooltip(self, parent):
+        # Одна подсказка на весь календарь, текст подгружается при наведении
+        self.calendar_tooltip = tk.Toplevel(parent)
+        self.calendar_tooltip.wm_overrideredirect(True)
+        self.calendar_tooltip.wm_geometry("+0+0")
+        self.calendar_tooltip.withdraw()
+        
+        self.calendar_tooltip_label = ttk.Label(
+            self.calendar_tooltip, 
+            text="", 
             background="#ffffe0", 
             relief="solid", 
             borderwidth=1,
             padding=5,
             font=('Helvetica', 9)
         )
-        label.pack()
-        
-        def enter(event):
-            x = widget.winfo_rootx() + widget.winfo_width() + 5
-            y = widget.winfo_rooty()
-            tooltip.wm_geometry(f"+{x}+{y}")
-            tooltip.deiconify()
+        self.calendar_tooltip_label.pack()
+    
+    def show_calendar_tooltip(self, widget, date_str):
+        summary = self.db.get_day_summaries(date_str, date_str, names_limit=3).get(date_str)
+        if not summary:
+            return
         
-        def leave(event):
-            tooltip.withdraw()
+        tooltip_text = "\n".join([f"• {name}" for name in summary['names']])
+        if summary['count'] > 3:
+            tooltip_text += f"\n+{summary['count']-3} ещё..."
+        self.calendar_tooltip_label.config(text=tooltip_text)
         
-        widget.bind("<Enter>", enter)
-        widget.bind("<Leave>", leave)
-        widget.bind("<ButtonPress>", lambda e: tooltip.withdraw())
+        x = widget.winfo_rootx() + widget.winfo_width() + 5
+        y = widget.winfo_rooty()
+        self.calendar_tooltip.wm_geometry(f"+{x}+{y}")
+        self.calendar_tooltip.deiconify()
+    
+    def hide_calendar_tooltip(self):
+        self.calendar_tooltip.withdraw()
 
     def play_notification_sound(self):
         if self.notification_sound:
-            try:
-                winsound.Beep(1000, 200)
-            except:
-                pass
+            self.sound.beep()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,168 @@
+import csv
+import json
+from datetime import date as Date, datetime, timedelta, timezone
+
+from schedule import DEFAULT_START, format_time
+
+FIELDS = ['date', 'start', 'end', 'id', 'name', 'priority', 'duration']
+
+
+def schedule_lines(date, slots, start=DEFAULT_START):
+    # Текстовый отчёт построчно, без сборки всего документа в памяти
+    yield f"=== Расписание на {date} ===\n\n"
+    yield f"Начало дня: {format_time(start)}\n\n"
+    for slot in slots:
+        task = slot.task
+        yield f"{format_time(slot.start)} - {format_time(slot.end)}\n"
+        yield f"  • {task.name}\n"
+        yield f"  • Приоритет: {task.priority}\n"
+        yield f"  • Длительность: {task.duration} мин\n\n"
+
+
+def schedule_records(date, slots):
+    for slot in slots:
+        task = slot.task
+        yield {
+            'date': date,
+            'start': format_time(slot.start),
+            'end': format_time(slot.end),
+            'id': task.id,
+            'name': task.name,
+            'priority': task.priority,
+            'duration': task.duration
+        }
+
+
+class ReportSink:
+    # Приёмник пишет в любой объект с методом write: файл, sys.stdout, socket.makefile()
+    def __init__(self, out, start=DEFAULT_START):
+        self.out = out
+        self.start = start
+
+    def begin(self):
+        pass
+
+    def day(self, date, slots):
+        for record in schedule_records(date, slots):
+            self.record(record)
+
+    def record(self, record):
+        raise NotImplementedError
+
+    def end(self):
+        pass
+
+
+class TextSink(ReportSink):
+    def __init__(self, out, start=DEFAULT_START):
+        super().__init__(out, start)
+        self.days = 0
+
+    def day(self, date, slots):
+        if not slots:
+            return
+        if self.days:
+            self.out.write("\n")
+        self.days += 1
+        for line in schedule_lines(date, slots, self.start):
+            self.out.write(line)
+
+
+class CsvSink(ReportSink):
+    def begin(self):
+        self.writer = csv.DictWriter(self.out, FIELDS)
+        self.writer.writeheader()
+
+    def record(self, record):
+        self.writer.writerow(record)
+
+
+class JsonLinesSink(ReportSink):
+    def record(self, record):
+        self.out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class JsonSink(ReportSink):
+    # JSON-массив, который пишется по одной записи
+    def begin(self):
+        self.out.write("[")
+        self.separator = "\n"
+
+    def record(self, record):
+        self.out.write(self.separator + json.dumps(record, ensure_ascii=False))
+        self.separator = ",\n"
+
+    def end(self):
+        self.out.write("\n]\n")
+
+
+def ics_escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def ics_fold(line):
+    # RFC 5545: строки длиннее 75 байт переносятся с пробелом в начале продолжения
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts = []
+    limit = 75
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+        limit = 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+class IcsSink(ReportSink):
+    def begin(self):
+        self.stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.lines("BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//planner//schedule//RU", "CALSCALE:GREGORIAN")
+
+    def day(self, date, slots):
+        midnight = datetime.combine(Date.fromisoformat(date), datetime.min.time())
+        for slot in slots:
+            task = slot.task
+            self.lines(
+                "BEGIN:VEVENT",
+                f"UID:task-{task.id}-{date}@planner",
+                f"DTSTAMP:{self.stamp}",
+                f"DTSTART:{(midnight + timedelta(minutes=slot.start)).strftime('%Y%m%dT%H%M%S')}",
+                f"DTEND:{(midnight + timedelta(minutes=slot.end)).strftime('%Y%m%dT%H%M%S')}",
+                f"SUMMARY:{ics_escape(task.name)}",
+                f"DESCRIPTION:{ics_escape('Приоритет: ' + task.priority)}",
+                "END:VEVENT"
+            )
+
+    def end(self):
+        self.lines("END:VCALENDAR")
+
+    def lines(self, *lines):
+        for line in lines:
+            self.out.write(ics_fold(line))
+
+
+SINKS = {
+    'text': TextSink,
+    'csv': CsvSink,
+    'jsonl': JsonLinesSink,
+    'json': JsonSink,
+    'ics': IcsSink
+}
+
+# Расширение файла -> формат, для диалога сохранения
+EXTENSIONS = {'.txt': 'text', '.csv': 'csv', '.jsonl': 'jsonl', '.json': 'json', '.ics': 'ics'}
+
+
+def write_report(out, days, format='text', start=DEFAULT_START):
+    # days - итератор пар (дата, слоты); каждая пара сразу уходит в приёмник;
+    # start - настроенное начало дня, первая задача может начинаться позже
+    sink = SINKS[format](out, start)
+    sink.begin()
+    for date, slots in days:
+        sink.day(date, slots)
+    sink.end()
+    return sink
@@ -0,0 +1,298 @@
+import heapq
+from bisect import bisect_right
+from collections import namedtuple
+from operator import attrgetter
+
+DAY_MINUTES = 24 * 60
+BREAK_MINUTES = 10
+DEFAULT_START = 9 * 60
+# Сколько раз plan_schedule пересобирает раскладку, вытесняя менее приоритетные задачи
+MAX_REPAIRS = 16
+
+# Время в минутах от начала суток
+Slot = namedtuple('Slot', ['start', 'end', 'task'])
+# Результат plan_schedule: слоты по времени и задачи, которые не поместились
+Plan = namedtuple('Plan', ['slots', 'unscheduled'])
+
+
+def parse_time(text, default=DEFAULT_START):
+    try:
+        hours, minutes = text.split(':')
+        hours, minutes = int(hours), int(minutes)
+    except (AttributeError, ValueError):
+        return default
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        return default
+    return hours * 60 + minutes
+
+
+def format_time(minutes):
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
+def build_schedule(tasks, start=DEFAULT_START, break_minutes=BREAK_MINUTES):
+    slots = []
+    current = start
+    for task in sorted(tasks, key=attrgetter('rank')):
+        end = current + task.duration
+        slots.append(Slot(current, end, task))
+        current = end + break_minutes
+    return slots
+
+
+def fits_in_day(slots):
+    return not slots or slots[-1].end <= DAY_MINUTES
+
+
+def day_end(start, count, total_duration, break_minutes=BREAK_MINUTES):
+    # Конец последней задачи без построения всего расписания
+    return start + total_duration + max(count - 1, 0) * break_minutes
+
+
+def check_constraints(duration, earliest=None, deadline=None, fixed_start=None, day_minutes=DAY_MINUTES):
+    # Текст ошибки или None; время - минуты от начала суток, None - ограничения нет
+    if fixed_start is not None:
+        if earliest is not None or deadline is not None:
+            return "Для задачи с точным временем не задают «не раньше» и «срок»"
+        if fixed_start + duration > day_minutes:
+            return "Задача с точным временем выходит за пределы дня (после 23:59)"
+    if earliest is not None and earliest + duration > (deadline if deadline is not None else day_minutes):
+        return "Задача не успевает завершиться между «не раньше» и сроком"
+    if deadline is not None and deadline < duration:
+        return "Срок раньше, чем задача может завершиться"
+    return None
+
+
+class Timeline:
+    # Занятые задачами с точным временем интервалы; перерыв нужен и до, и после каждого
+    def __init__(self, break_minutes):
+        self.break_minutes = break_minutes
+        self.blocks = []
+        self.ends = []
+
+    def conflicts(self, start, end):
+        index = bisect_right(self.ends, start - self.break_minutes)
+        return index < len(self.blocks) and self.blocks[index][0] < end + self.break_minutes
+
+    def add(self, start, end):
+        index = bisect_right(self.ends, end)
+        self.blocks.insert(index, (start, end))
+        self.ends.insert(index, end)
+
+    def free_at(self, current, duration):
+        # Первый момент не раньше current, когда задача помещается между блоками
+        index = bisect_right(self.ends, current - self.break_minutes)
+        while index < len(self.blocks) and current + duration + self.break_minutes > self.blocks[index][0]:
+            current = max(current, self.blocks[index][1] + self.break_minutes)
+            index += 1
+        return current
+
+    def gap(self, current):
+        # Номер ближайшего блока и сколько минут можно занять с current до него (с перерывом перед ним);
+        # задача помещается в current, если её длительность не больше этого
+        index = bisect_right(self.ends, current - self.break_minutes)
+        if index == len(self.blocks):
+            return index, float('inf')
+        return index, self.blocks[index][0] - self.break_minutes - current
+
+    def next_free(self, current):
+        # Конец ближайшего блока, который ещё не закончился к current
+        index = bisect_right(self.ends, current - self.break_minutes)
+        return self.blocks[index][1] + self.break_minutes if index < len(self.blocks) else None
+
+
+def lay_out(tasks, timeline, start, break_minutes, day_minutes):
+    # Жадная раскладка по EDF: из уже доступных задач берётся та, у которой раньше срок,
+    # при равных сроках - более приоритетная. Свободные окна перед блоками заполняются задачами, которые в них влезают
+    release = lambda task: max(start, task.earliest or 0)
+    deadline = lambda task: min(day_minutes, task.deadline if task.deadline is not None else day_minutes)
+    order = sorted(tasks, key=release)
+    ready = []
+    # Готовые задачи, не поместившиеся до ближайшего блока: окно до него только сужается,
+    # поэтому они возвращаются в очередь, когда блок пройден
+    skipped = []
+    block = None
+    placed = []
+    late = []
+    current = start
+    index = 0
+    while index < len(order) or ready or skipped:
+        if not ready and not skipped:
+            current = max(current, release(order[index]))
+        while index < len(order) and release(order[index]) <= current:
+            task = order[index]
+            heapq.heappush(ready, (deadline(task), task.rank, task.id, task))
+            index += 1
+
+        next_block, room = timeline.gap(current)
+        if next_block != block:
+            block = next_block
+            for item in skipped:
+                heapq.heappush(ready, item)
+            skipped = []
+
+        chosen = None
+        while ready:
+            item = heapq.heappop(ready)
+            task = item[3]
+            if current + task.duration > item[0]:
+                # Время только растёт: к сроку задача уже не успеет
+                late.append(task)
+            elif task.duration <= room:
+                chosen = task
+                break
+            else:
+                skipped.append(item)
+
+        if chosen is not None:
+            placed.append(Slot(current, current + chosen.duration, chosen))
+            current += chosen.duration + break_minutes
+        elif skipped:
+            # До ближайшего блока ничего не помещается - продолжаем после него
+            # или раньше, когда станет доступна следующая задача
+            current = timeline.next_free(current)
+            if index < len(order):
+                current = min(current, release(order[index]))
+    return placed, late
+
+
+def fits_free_time(task, timeline, start, day_minutes):
+    # Помещается ли задача одна в свободное от блоков время с учётом «не раньше» и срока
+    release = max(start, task.earliest or 0)
+    limit = min(day_minutes, task.deadline if task.deadline is not None else day_minutes)
+    return timeline.free_at(release, task.duration) + task.duration <= limit
+
+
+def each_day(dates, days):
+    # Дополняет упорядоченный по дате поток (дата, задачи) днями без задач
+    days = iter(days)
+    pending = next(days, None)
+    for date in dates:
+        if pending is not None and pending[0] == date:
+            yield pending
+            pending = next(days, None)
+        else:
+            yield date, []
+
+
+def fits_alone(task, start=DEFAULT_START, break_minutes=BREAK_MINUTES):
+    return bool(plan_schedule([task], start, break_minutes).slots)
+
+
+def plan_days(days, start=DEFAULT_START, break_minutes=BREAK_MINUTES, leftovers=None):
+    # Переносящее планирование по диапазону: что не поместилось в день, переходит в следующий
+    # и стоит в очереди вместе с его задачами (порядок - по приоритету, затем по id, т.е. старые раньше).
+    # Отдаёт (дата, Plan). В leftovers попадает то, что не поместилось во весь диапазон:
+    # задачи, которые не влезают даже в пустой день (один раз, без переноса), и остаток последнего дня
+    carry = []
+    plan = None
+    for date, tasks in days:
+        plan = plan_schedule(carry + tasks, start, break_minutes)
+        yield date, plan
+        carry = []
+        for task in plan.unscheduled:
+            # Повторяющиеся задачи не переносятся: на следующий день у правила своё повторение
+            if task.recurrence_id is not None:
+                continue
+            if fits_alone(task, start, break_minutes):
+                carry.append(task)
+            elif leftovers is not None:
+                leftovers.append(task)
+    if leftovers is not None:
+        leftovers.extend(carry)
+
+
+def rolled_over(date, plan):
+    # Задачи, которые план ставит не на их собственную дату: (id, новая дата)
+    return [(slot.task.id, date) for slot in plan.slots if slot.task.date != date]
+
+
+def plan_score(slots):
+    # Сравнение раскладок: сначала минуты высокого приоритета, затем среднего, затем низкого
+    minutes = [0, 0, 0]
+    for slot in slots:
+        minutes[slot.task.rank - 1] += slot.task.duration
+    return minutes
+
+
+def plan_schedule(tasks, start=DEFAULT_START, break_minutes=BREAK_MINUTES, day_minutes=DAY_MINUTES):
+    # Задачи с точным временем ставятся первыми (при пересечении остаётся более приоритетная),
+    # остальные раскладываются вокруг них с учётом «не раньше» и срока.
+    # Без ограничений результат совпадает с build_schedule, пока всё помещается в день
+    timeline = Timeline(break_minutes)
+    fixed_slots = []
+    unscheduled = []
+    flexible = []
+    for task in sorted(tasks, key=attrgetter('rank', 'id')):
+        if task.fixed_start is None:
+            flexible.append(task)
+            continue
+        end = task.fixed_start + task.duration
+        if end > day_minutes or timeline.conflicts(task.fixed_start, end):
+            unscheduled.append(task)
+        else:
+            timeline.add(task.fixed_start, end)
+            fixed_slots.append(Slot(task.fixed_start, end, task))
+
+    # Задачи, которые не помещаются даже в пустой день (с учётом блоков), сразу уходят в unscheduled:
+    # иначе каждая из них тратила бы попытку исправления раскладки ниже
+    feasible = []
+    for task in flexible:
+        if fits_free_time(task, timeline, start, day_minutes):
+            feasible.append(task)
+        else:
+            unscheduled.append(task)
+    flexible = feasible
+
+    placed, late = lay_out(flexible, timeline, start, break_minutes, day_minutes)
+
+    # Если не поместилась более приоритетная задача, убираем менее приоритетные, стоящие раньше её срока,
+    # пока не освободится нужное время; изменение остаётся, только если раскладка стала лучше
+    dropped = []
+    hopeless = set()
+    for _ in range(MAX_REPAIRS):
+        victims = None
+        for task in sorted(late, key=attrgetter('rank', 'id')):
+            if task.id in hopeless:
+                continue
+            limit = min(day_minutes, task.deadline if task.deadline is not None else day_minutes)
+            candidates = [slot.task for slot in placed if slot.task.rank > task.rank and slot.start < limit]
+            if candidates:
+                victims = set()
+                freed = 0
+                for victim in sorted(candidates, key=attrgetter('rank', 'duration'), reverse=True):
+                    victims.add(victim.id)
+                    freed += victim.duration + break_minutes
+                    if freed >= task.duration + break_minutes:
+                        break
+                break
+            hopeless.add(task.id)
+        if victims is None:
+            break
+
+        trial = [other for other in flexible if other.id not in victims]
+        trial_placed, trial_late = lay_out(trial, timeline, start, break_minutes, day_minutes)
+        if plan_score(trial_placed) > plan_score(placed):
+            dropped.extend(other for other in flexible if other.id in victims)
+            flexible, placed, late = trial, trial_placed, trial_late
+        else:
+            hopeless.add(task.id)
+
+    # Вытесненные и опоздавшие задачи ещё раз раскладываются по окнам между уже поставленными:
+    # не поместиться должны только те, для которых в дне действительно нет места
+    if late or dropped:
+        taken = Timeline(break_minutes)
+        for slot in fixed_slots + placed:
+            taken.add(slot.start, slot.end)
+        rest = []
+        for task in late + dropped:
+            if fits_free_time(task, taken, start, day_minutes):
+                rest.append(task)
+            else:
+                unscheduled.append(task)
+        filled, late = lay_out(rest, taken, start, break_minutes, day_minutes)
+        placed += filled
+
+    slots = sorted(fixed_slots + placed, key=attrgetter('start'))
+    unscheduled = sorted(unscheduled + late, key=attrgetter('rank', 'id'))
+    return Plan(slots, unscheduled)
@@ -0,0 +1,139 @@
+import array
+import io
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import wave
+from functools import lru_cache
+
+try:
+    import winsound
+except ImportError:
+    winsound = None
+
+SAMPLE_RATE = 22050
+ALARM_TONE = (1000, 500)
+ALARM_PAUSE = 0.5
+BEEP_TONE = (1000, 200)
+# Консольные проигрыватели WAV, которые ищем на Linux
+WAV_PLAYERS = [['paplay'], ['aplay', '-q'], ['afplay']]
+
+
+@lru_cache(maxsize=None)
+def render_tone(frequency, duration_ms, rate=SAMPLE_RATE):
+    # Синусоида в WAV (16 бит, моно); один и тот же буфер переиспользуется для всех сигналов
+    count = rate * duration_ms // 1000
+    step = 2 * math.pi * frequency / rate
+    samples = array.array('h', (int(12000 * math.sin(step * i)) for i in range(count)))
+    if sys.byteorder != 'little':
+        samples.byteswap()
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+class SilentBackend:
+    # Ничего не воспроизводит, только выдерживает длительность сигнала
+    def play(self, tone, cancel):
+        cancel.wait(tone[1] / 1000)
+
+    def stop(self):
+        pass
+
+
+class WinsoundBackend:
+    def play(self, tone, cancel):
+        # SND_MEMORY нельзя сочетать с SND_ASYNC, поэтому играем синхронно в потоке плеера
+        winsound.PlaySound(render_tone(*tone), winsound.SND_MEMORY | winsound.SND_NODEFAULT)
+
+    def stop(self):
+        winsound.PlaySound(None, 0)
+
+
+class WavFileBackend:
+    def __init__(self, command):
+        self.command = command
+        self.lock = threading.Lock()
+        self.processes = set()
+
+    def tone_file(self, tone):
+        path = os.path.join(tempfile.gettempdir(), f"planner_tone_{tone[0]}_{tone[1]}.wav")
+        if not os.path.exists(path):
+            # Пишем во временный файл, чтобы проигрыватель не увидел недописанный
+            partial = f"{path}.{os.getpid()}.{threading.get_ident()}"
+            with open(partial, 'wb') as file:
+                file.write(render_tone(*tone))
+            os.replace(partial, path)
+        return path
+
+    def play(self, tone, cancel):
+        process = subprocess.Popen(self.command + [self.tone_file(tone)],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with self.lock:
+            self.processes.add(process)
+        try:
+            if not cancel.is_set():
+                process.wait()
+        finally:
+            with self.lock:
+                self.processes.discard(process)
+            if process.poll() is None:
+                process.terminate()
+
+    def stop(self):
+        with self.lock:
+            processes = list(self.processes)
+        for process in processes:
+            process.terminate()
+
+
+def default_backend():
+    if winsound is not None:
+        return WinsoundBackend()
+    for command in WAV_PLAYERS:
+        if shutil.which(command[0]):
+            return WavFileBackend(command)
+    return SilentBackend()
+
+
+class SoundPlayer:
+    def __init__(self, backend=None):
+        self.backend = backend or default_backend()
+        self.cancel = threading.Event()
+
+    def start_alarm(self, tone=ALARM_TONE, pause=ALARM_PAUSE):
+        self.stop()
+        self.cancel = threading.Event()
+        self.run(self.alarm, tone, pause, self.cancel)
+
+    def beep(self, tone=BEEP_TONE):
+        self.run(self.play, tone, threading.Event())
+
+    def stop(self):
+        # Не ждём поток: он сам завершится, увидев установленное событие
+        self.cancel.set()
+        self.backend.stop()
+
+    def run(self, target, *args):
+        threading.Thread(target=target, args=args, daemon=True).start()
+
+    def alarm(self, tone, pause, cancel):
+        while not cancel.is_set():
+            self.play(tone, cancel)
+            cancel.wait(pause)
+
+    def play(self, tone, cancel):
+        try:
+            self.backend.play(tone, cancel)
+        except Exception:
+            # Звуковая система недоступна - молча переходим на тишину
+            self.backend = SilentBackend()
@@ -0,0 +1,377 @@
+import json
+import os
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+
+from base import PRIORITY_NAMES, PRIORITY_ORDER, SEARCH_FOLD, Database, Storage, Task, expand_occurrences, from_day, search_words, to_day
+
+# Журнал переписывается снимком при открытии, если записей в нём вдвое больше, чем живых объектов
+COMPACT_MIN_RECORDS = 1000
+OCCURRENCE_CACHE_SIZE = 4096
+TASK_FIELDS = Task.__slots__
+RECURRENCE_FIELDS = ('id', 'name', 'priority', 'duration', 'rule', 'first_day', 'last_day',
+                     'earliest', 'deadline', 'fixed_start', 'created_at')
+
+
+def timestamp():
+    # Тот же формат, что у CURRENT_TIMESTAMP в SQLite
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def task_record(task):
+    record = {'op': 'task'}
+    record.update((field, getattr(task, field)) for field in TASK_FIELDS)
+    return record
+
+
+def recurrence_record(recurrence):
+    record = {'op': 'recurrence'}
+    record.update((field, recurrence[field]) for field in RECURRENCE_FIELDS)
+    return record
+
+
+class LogStorage(Storage):
+    # Журнал операций в формате JSON lines: каждое изменение дописывается строкой в конец файла,
+    # при открытии журнал проигрывается в память, и все чтения идут из памяти.
+    # Писать в один журнал может только один процесс
+    def __init__(self, path, sync=False, cache_size=None):
+        # cache_size принимается для совместимости с Database: данные и так в памяти
+        self.path = path
+        self.sync = sync
+        self.lock = threading.RLock()
+        # id -> Task в порядке id; номер дня -> отсортированный список id
+        self.tasks = {}
+        # id задачи -> имя, приведённое для поиска (регистр, диакритика, ё), чтобы не считать его при каждом запросе
+        self.search_names = {}
+        self.days = {}
+        # id правила -> поля правила; id правила -> пропущенные дни
+        self.recurrences = {}
+        self.skips = {}
+        self.occurrences = {}
+        self.last_id = 0
+        self.last_recurrence_id = 0
+        self.records = 0
+        self.log = None
+
+        self.replay()
+        live = len(self.tasks) + len(self.recurrences) + sum(len(days) for days in self.skips.values())
+        if self.records > max(COMPACT_MIN_RECORDS, 2 * live):
+            self.compact()
+        else:
+            self.log = open(path, 'a', encoding='utf-8', newline='\n')
+
+    def replay(self):
+        if not os.path.exists(self.path):
+            return
+        valid = 0
+        with open(self.path, 'rb') as file:
+            for line in file:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("запись не дописана")
+                    record = json.loads(line)
+                except ValueError:
+                    # Недописанная последняя строка (сбой во время записи) отбрасывается,
+                    # испорченная строка в середине журнала - ошибка
+                    if file.read(1):
+                        raise ValueError(f"{self.path}: повреждена запись {self.records + 1}")
+                    break
+                self.apply(record)
+                self.records += 1
+                valid += len(line)
+        if valid < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as file:
+                file.truncate(valid)
+
+    def apply(self, record):
+        op = record['op']
+        if op == 'task':
+            task = Task(*(record[field] for field in TASK_FIELDS))
+            old = self.tasks.get(task.id)
+            if old is not None:
+                self.unindex(old)
+            self.tasks[task.id] = task
+            self.search_names[task.id] = task.name.lower().translate(SEARCH_FOLD)
+            insort(self.days.setdefault(task.day, []), task.id)
+            self.last_id = max(self.last_id, task.id)
+        elif op == 'delete':
+            task = self.tasks.pop(record['id'], None)
+            self.search_names.pop(record['id'], None)
+            if task is not None:
+                self.unindex(task)
+        elif op == 'recurrence':
+            self.recurrences[record['id']] = {field: record[field] for field in RECURRENCE_FIELDS}
+            self.last_recurrence_id = max(self.last_recurrence_id, record['id'])
+            self.occurrences.clear()
+        elif op == 'skip':
+            self.skips.setdefault(record['id'], set()).add(record['day'])
+            self.occurrences.clear()
+        elif op == 'end':
+            # Как Database.end_recurrence: повторения с этого дня удаляются, правило без повторений - целиком
+            recurrence_id, day = record['id'], record['day']
+            recurrence = self.recurrences.get(recurrence_id)
+            if recurrence is not None:
+                last_day = recurrence['last_day']
+                recurrence['last_day'] = day - 1 if last_day is None else min(last_day, day - 1)
+                skips = {skip for skip in self.skips.pop(recurrence_id, ()) if skip < day}
+                if recurrence['first_day'] >= day:
+                    del self.recurrences[recurrence_id]
+                elif skips:
+                    self.skips[recurrence_id] = skips
+            self.occurrences.clear()
+        elif op == 'ids':
+            # Заголовок снимка: id не переиспользуются и после удаления задач
+            self.last_id = max(self.last_id, record['task'])
+            self.last_recurrence_id = max(self.last_recurrence_id, record['recurrence'])
+        else:
+            raise ValueError(f"{self.path}: неизвестная операция {op!r}")
+
+    def unindex(self, task):
+        ids = self.days[task.day]
+        del ids[bisect_left(ids, task.id)]
+        if not ids:
+            del self.days[task.day]
+
+    def write(self, records):
+        # Сначала журнал, потом память: если запись не удалась, состояние не расходится с файлом
+        if not records:
+            return
+        with self.lock:
+            self.log.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+            self.log.flush()
+            if self.sync:
+                os.fsync(self.log.fileno())
+            for record in records:
+                self.apply(record)
+            self.records += len(records)
+
+    def compact(self):
+        # Журнал заменяется снимком текущего состояния; до os.replace старый файл остаётся целым
+        with self.lock:
+            records = [{'op': 'ids', 'task': self.last_id, 'recurrence': self.last_recurrence_id}]
+            records.extend(task_record(task) for task in self.tasks.values())
+            records.extend(recurrence_record(recurrence) for recurrence in self.recurrences.values())
+            records.extend({'op': 'skip', 'id': recurrence_id, 'day': day}
+                           for recurrence_id, days in self.skips.items() for day in sorted(days))
+
+            partial = f"{self.path}.{os.getpid()}.tmp"
+            with open(partial, 'w', encoding='utf-8', newline='\n') as file:
+                for record in records:
+                    file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                file.flush()
+                os.fsync(file.fileno())
+            if self.log is not None:
+                self.log.close()
+            os.replace(partial, self.path)
+            self.log = open(self.path, 'a', encoding='utf-8', newline='\n')
+            self.records = len(records)
+
+    def close(self):
+        with self.lock:
+            if self.log is not None:
+                self.log.close()
+                self.log = None
+
+    def tasks_of(self, day):
+        return list(self.get_occurrences(day)) + [self.tasks[task_id] for task_id in self.days.get(day, ())]
+
+    def days_between(self, first_day, last_day):
+        # Короткий диапазон перебирается по дням, длинный - по дням, в которых есть задачи
+        if self.recurrences or last_day - first_day < len(self.days):
+            return range(first_day, last_day + 1)
+        return sorted(day for day in self.days if first_day <= day <= last_day)
+
+    def get_tasks_by_date(self, date):
+        with self.lock:
+            return self.tasks_of(to_day(date))
+
+    def iter_tasks_by_range(self, start_date, end_date):
+        with self.lock:
+            days = [(day, self.tasks_of(day)) for day in self.days_between(to_day(start_date), to_day(end_date))]
+        for day, tasks in days:
+            if tasks:
+                yield from_day(day), tasks
+
+    def count_tasks_by_date(self, date):
+        day = to_day(date)
+        with self.lock:
+            return len(self.get_occurrences(day)) + len(self.days.get(day, ()))
+
+    def get_tasks_page(self, date, offset, limit):
+        with self.lock:
+            return self.tasks_of(to_day(date))[offset:offset + limit]
+
+    def get_task_date(self, task_id):
+        task = self.tasks.get(task_id)
+        return task.date if task else None
+
+    def get_task_by_id(self, task_id):
+        return self.tasks.get(task_id)
+
+    def search_tasks(self, text, limit=50, before_id=None):
+        # Индекса нет: задачи просматриваются от новых к старым, пока не наберётся limit
+        words = search_words(text)
+        if not words:
+            return []
+        found = []
+        with self.lock:
+            for task in reversed(self.tasks.values()):
+                if before_id is not None and task.id >= before_id:
+                    continue
+                # Дешёвая проверка подстрокой отсекает почти все задачи до разбора на слова
+                name = self.search_names[task.id]
+                if not all(word in name for word in words):
+                    continue
+                names = search_words(name)
+                if all(any(name.startswith(word) for name in names) for word in words):
+                    found.append(task)
+                    if len(found) >= limit:
+                        break
+        return found
+
+    def get_day_summaries(self, start_date, end_date, names_limit=3):
+        summaries = {}
+        with self.lock:
+            for day in self.days_between(to_day(start_date), to_day(end_date)):
+                tasks = self.tasks_of(day)
+                if not tasks:
+                    continue
+                summaries[from_day(day)] = {
+                    'count': len(tasks),
+                    'duration': sum(task.duration for task in tasks),
+                    'top_priority': PRIORITY_NAMES[min(task.rank for task in tasks)],
+                    'names': [task.name for task in tasks[:names_limit]]
+                }
+        return summaries
+
+    def add_task(self, name, priority, duration, date, earliest=None, deadline=None, fixed_start=None):
+        with self.lock:
+            task_id = self.last_id + 1
+            self.write([task_record(Task(task_id, name, PRIORITY_ORDER[priority], duration, to_day(date), timestamp(),
+                                         earliest, deadline, fixed_start))])
+        return task_id
+
+    def add_tasks(self, tasks):
+        created_at = timestamp()
+        with self.lock:
+            records = [
+                task_record(Task(task_id, task['name'], PRIORITY_ORDER[task['priority']], task['duration'],
+                                 to_day(task['date']), created_at,
+                                 task.get('earliest'), task.get('deadline'), task.get('fixed_start')))
+                for task_id, task in enumerate(tasks, start=self.last_id + 1)
+            ]
+            self.write(records)
+        return len(records)
+
+    def update_task(self, task_id, name, priority, duration, date, earliest=None, deadline=None, fixed_start=None):
+        with self.lock:
+            old = self.tasks.get(task_id)
+            if old is not None:
+                self.write([task_record(Task(task_id, name, PRIORITY_ORDER[priority], duration, to_day(date), old.created_at,
+                                             earliest, deadline, fixed_start))])
+
+    def move_tasks(self, moves):
+        with self.lock:
+            records = []
+            for task_id, date in moves:
+                old = self.tasks.get(task_id)
+                if old is not None:
+                    records.append(task_record(Task(task_id, old.name, old.rank, old.duration, to_day(date), old.created_at,
+                                                    old.earliest, old.deadline, old.fixed_start)))
+            self.write(records)
+        return len(records)
+
+    def delete_task(self, task_id):
+        self.delete_tasks([task_id])
+
+    def delete_tasks(self, task_ids):
+        with self.lock:
+            records = [{'op': 'delete', 'id': task_id} for task_id in set(task_ids) if task_id in self.tasks]
+            self.write(records)
+        return len(records)
+
+    def delete_tasks_by_date(self, date):
+        # Повторения этого дня пропускаются, сами правила остаются
+        day = to_day(date)
+        with self.lock:
+            records = [{'op': 'delete', 'id': task_id} for task_id in self.days.get(day, ())]
+            records.extend({'op': 'skip', 'id': task.recurrence_id, 'day': day} for task in self.get_occurrences(day))
+            self.write(records)
+        return len(records)
+
+    def get_recurrences(self):
+        with self.lock:
+            return [(recurrence, self.skips.get(recurrence_id, frozenset()))
+                    for recurrence_id, recurrence in sorted(self.recurrences.items())]
+
+    def get_occurrences(self, day):
+        with self.lock:
+            tasks = self.occurrences.get(day)
+            if tasks is None:
+                if len(self.occurrences) >= OCCURRENCE_CACHE_SIZE:
+                    self.occurrences.clear()
+                tasks = self.occurrences[day] = expand_occurrences(self.get_recurrences(), day) if self.recurrences else ()
+            return tasks
+
+    def get_recurrence(self, recurrence_id):
+        recurrence = self.recurrences.get(recurrence_id)
+        return dict(recurrence) if recurrence else None
+
+    def add_recurrence(self, name, priority, duration, rule, start_date, end_date=None,
+                       earliest=None, deadline=None, fixed_start=None):
+        if rule not in ('daily', 'weekdays', 'weekly', 'monthly'):
+            raise ValueError(f"неизвестное правило повторения {rule!r}")
+        with self.lock:
+            recurrence_id = self.last_recurrence_id + 1
+            self.write([recurrence_record({
+                'id': recurrence_id, 'name': name, 'priority': PRIORITY_ORDER[priority], 'duration': duration,
+                'rule': rule, 'first_day': to_day(start_date), 'last_day': to_day(end_date) if end_date else None,
+                'earliest': earliest, 'deadline': deadline, 'fixed_start': fixed_start, 'created_at': timestamp()
+            })])
+        return recurrence_id
+
+    def update_recurrence(self, recurrence_id, name, priority, duration, earliest=None, deadline=None, fixed_start=None):
+        with self.lock:
+            old = self.recurrences.get(recurrence_id)
+            if old is not None:
+                self.write([recurrence_record(dict(old, name=name, priority=PRIORITY_ORDER[priority], duration=duration,
+                                                   earliest=earliest, deadline=deadline, fixed_start=fixed_start))])
+
+    def skip_occurrence(self, recurrence_id, date):
+        with self.lock:
+            if recurrence_id in self.recurrences:
+                self.write([{'op': 'skip', 'id': recurrence_id, 'day': to_day(date)}])
+
+    def end_recurrence(self, recurrence_id, date):
+        with self.lock:
+            if recurrence_id in self.recurrences:
+                self.write([{'op': 'end', 'id': recurrence_id, 'day': to_day(date)}])
+
+    def __del__(self):
+        self.close()
+
+
+def memory_storage(path=':memory:', **options):
+    # SQLite в памяти: для тестов и замеров, данные пропадают при закрытии
+    return Database(':memory:', **options)
+
+
+BACKENDS = {
+    'sqlite': Database,
+    'memory': memory_storage,
+    'log': LogStorage
+}
+
+# Расширение файла -> хранилище; остальные файлы открываются как SQLite
+EXTENSIONS = {'.log': 'log', '.jsonl': 'log'}
+
+
+def detect_backend(path):
+    if path == ':memory:':
+        return 'memory'
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), 'sqlite')
+
+
+def open_storage(path='planner.db', backend=None, **options):
+    return BACKENDS[backend or detect_backend(path)](path, **options)
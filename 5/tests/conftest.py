@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули планировщика лежат в 5/ и импортируются без пакета, как при запуске программ из этой папки
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
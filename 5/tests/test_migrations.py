@@ -0,0 +1,122 @@
+import ast
+import glob
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from base import MIGRATIONS, Database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SHIPPED = sorted(glob.glob(os.path.join(ROOT, '*', '*.db')))
+LEGACY = [os.path.join(ROOT, 'версия', 'planer12.py'),
+          os.path.join(ROOT, 'версия 3', 'Planner7.py'),
+          os.path.join(ROOT, 'версия 4', 'planner16.py')]
+
+
+def legacy_migrations(path):
+    # Список MIGRATIONS без импорта модуля: старые версии сразу открывают окно tkinter
+    with open(path, encoding='utf-8') as file:
+        tree = ast.parse(file.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], 'id', None) == 'MIGRATIONS':
+            return ast.literal_eval(node.value)
+
+
+def old_tasks(path):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(conn.execute("SELECT id, name, priority, duration, date FROM tasks"))
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('path', SHIPPED, ids=lambda path: os.path.relpath(path, ROOT))
+def test_shipped_database_migrates(tmp_path, path):
+    copy = str(tmp_path / 'planner.db')
+    shutil.copy(path, copy)
+    rows = old_tasks(copy)
+
+    db = Database(copy)
+    try:
+        assert db.conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+        migrated = sorted((task.id, task.name, task.priority, task.duration, task.date)
+                          for date in {row[4] for row in rows} for task in db.get_tasks_by_date(date))
+    finally:
+        db.close()
+    assert migrated == rows
+
+
+@pytest.mark.parametrize('path', LEGACY, ids=os.path.basename)
+def test_legacy_migrations_match_base(path):
+    # Все версии ведут один счётчик PRAGMA user_version, поэтому версия N везде означает одну схему
+    migrations = legacy_migrations(path)
+    assert migrations == MIGRATIONS[:len(migrations)]
+
+
+def test_database_opens_file_upgraded_by_old_legacy_planner(tmp_path):
+    # Прежние копии миграции 2 в старых версиях создавали tasks без created_at
+    path = str(tmp_path / 'planner.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            duration INTEGER NOT NULL,
+            day INTEGER NOT NULL
+        );
+        CREATE INDEX idx_tasks_day_priority ON tasks (day, priority);
+        INSERT INTO tasks (name, priority, duration, day) VALUES ('старая', 1, 30, 739442);
+        PRAGMA user_version = 2;
+    ''')
+    conn.close()
+
+    db = Database(path)
+    try:
+        assert [(task.name, task.priority, task.date) for task in db.get_tasks_by_date('2025-07-10')] == [
+            ('старая', 'Высокий', '2025-07-10')]
+        assert db.get_day_summary('2025-07-10')['count'] == 1
+    finally:
+        db.close()
+
+
+def test_migration_pads_dates_and_keeps_unparseable_rows(tmp_path):
+    path = str(tmp_path / 'planner.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, "
+                 "priority TEXT NOT NULL, duration INTEGER NOT NULL, date TEXT NOT NULL)")
+    conn.executemany("INSERT INTO tasks (name, priority, duration, date) VALUES (?, 'Средний', 30, ?)",
+                     [('a', '2025-7-2'), ('b', '2025-07-02'), ('c', 'завтра'), ('d', '2025-13-01')])
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    try:
+        assert [task.name for task in db.get_tasks_by_date('2025-07-02')] == ['a', 'b']
+        invalid = db.conn.execute("SELECT name, date FROM tasks_invalid ORDER BY id").fetchall()
+    finally:
+        db.close()
+    assert [tuple(row) for row in invalid] == [('c', 'завтра'), ('d', '2025-13-01')]
+
+
+def test_migration_keeps_rows_with_unknown_priority(tmp_path):
+    # Старые версии принимали в поле приоритета любой текст: такие строки не должны стать «Низкий»
+    path = str(tmp_path / 'planner.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, "
+                 "priority TEXT NOT NULL, duration INTEGER NOT NULL, date TEXT NOT NULL)")
+    conn.executemany("INSERT INTO tasks (name, priority, duration, date) VALUES (?, ?, 30, '2025-07-02')",
+                     [('a', 'высокий'), ('b', ' Средний '), ('c', 'низкий'), ('d', 'срочно'), ('e', '')])
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    try:
+        assert [(task.name, task.priority) for task in db.get_tasks_by_date('2025-07-02')] == [
+            ('a', 'Высокий'), ('b', 'Средний'), ('c', 'Низкий')]
+        invalid = db.conn.execute("SELECT name, priority FROM tasks_invalid ORDER BY id").fetchall()
+    finally:
+        db.close()
+    assert [tuple(row) for row in invalid] == [('d', 'срочно'), ('e', '')]
@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+from base import Task, to_day
+from schedule import BREAK_MINUTES, DAY_MINUTES, build_schedule, fits_in_day, plan_days, plan_schedule
+
+
+def random_tasks(rng, count):
+    tasks = []
+    for task_id in range(1, count + 1):
+        duration = rng.randint(5, 120)
+        kind = rng.random()
+        if kind < 0.15:
+            tasks.append(Task(task_id, 'f', rng.randint(1, 3), duration, 1, fixed_start=rng.randint(0, DAY_MINUTES - duration)))
+        elif kind < 0.5:
+            tasks.append(Task(task_id, 'c', rng.randint(1, 3), duration, 1,
+                              earliest=rng.choice([None, rng.randint(0, 1200)]),
+                              deadline=rng.choice([None, rng.randint(60, DAY_MINUTES)])))
+        else:
+            tasks.append(Task(task_id, 'p', rng.randint(1, 3), duration, 1))
+    return tasks
+
+
+def fits_in_gap(task, slots, start):
+    # Проверка без Timeline: задача встаёт в окно с перерывом до и после соседних слотов
+    release = max(start, task.earliest or 0)
+    limit = min(DAY_MINUTES, task.deadline if task.deadline is not None else DAY_MINUTES)
+    for begin in [release] + [slot.end + BREAK_MINUTES for slot in slots]:
+        if begin < release or begin + task.duration > limit:
+            continue
+        if all(begin + task.duration + BREAK_MINUTES <= slot.start or slot.end + BREAK_MINUTES <= begin for slot in slots):
+            return True
+    return False
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_plan_schedule_invariants(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        tasks = random_tasks(rng, rng.randint(0, 30))
+        start = rng.randint(0, 720)
+        slots, unscheduled = plan_schedule(tasks, start)
+
+        # Каждая задача либо в расписании, либо среди не поместившихся, и только один раз
+        assert sorted([slot.task.id for slot in slots] + [task.id for task in unscheduled]) == [task.id for task in tasks]
+
+        for previous, slot in zip(slots, slots[1:]):
+            assert previous.end + BREAK_MINUTES <= slot.start
+        for slot in slots:
+            task = slot.task
+            assert slot.end - slot.start == task.duration
+            assert slot.end <= DAY_MINUTES
+            if task.fixed_start is not None:
+                assert slot.start == task.fixed_start
+            else:
+                assert slot.start >= max(start, task.earliest or 0)
+                if task.deadline is not None:
+                    assert slot.end <= task.deadline
+
+        # Не поместившаяся задача без точного времени не должна влезать ни в одно свободное окно
+        for task in unscheduled:
+            if task.fixed_start is None:
+                assert not fits_in_gap(task, slots, start), task
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_plan_schedule_matches_build_schedule_without_constraints(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        tasks = [Task(task_id, 'p', rng.randint(1, 3), rng.randint(5, 90), 1) for task_id in range(rng.randint(0, 12))]
+        start = rng.randint(0, 600)
+        slots = build_schedule(tasks, start)
+        plan = plan_schedule(tasks, start)
+        if fits_in_day(slots):
+            assert plan.slots == slots and not plan.unscheduled
+        else:
+            assert plan.unscheduled
+
+
+def test_plan_schedule_keeps_feasible_tasks_after_one_too_long():
+    # Задача длиной в сутки не должна вытеснять из дня остальные
+    tasks = [Task(1, 'A', 2, 1440, 1), Task(2, 'B', 2, 500, 1), Task(3, 'C', 3, 30, 1)]
+    slots, unscheduled = plan_schedule(tasks, 540)
+    assert [(slot.start, slot.end, slot.task.id) for slot in slots] == [(540, 1040, 2), (1050, 1080, 3)]
+    assert [task.id for task in unscheduled] == [1]
+
+
+def test_plan_schedule_reconsiders_evicted_tasks():
+    # Низкоприоритетная задача уступает место срочной, но потом встаёт после неё
+    low = Task(1, 'L', 3, 60, 1)
+    high = Task(2, 'H', 1, 60, 1, earliest=560, deadline=630)
+    slots, unscheduled = plan_schedule([low, high], 540)
+    assert [(slot.start, slot.end, slot.task.id) for slot in slots] == [(560, 620, 2), (630, 690, 1)]
+    assert not unscheduled
+
+
+def test_plan_days_reports_task_that_never_fits_once():
+    first = to_day('2025-07-10')
+    days = [
+        ('2025-07-10', [Task(1, 'big', 1, 1000, first), Task(2, 'x', 2, 600, first), Task(3, 'y', 3, 600, first)]),
+        ('2025-07-11', []),
+        ('2025-07-12', []),
+    ]
+    leftovers = []
+    plans = list(plan_days(days, 540, leftovers=leftovers))
+
+    assert [slot.task.id for slot in plans[0][1].slots] == [2]
+    assert [slot.task.id for slot in plans[1][1].slots] == [3]
+    assert not plans[2][1].slots and not plans[2][1].unscheduled
+    assert [task.id for task in leftovers] == [1]
+
+
+def test_plan_days_reports_carry_of_last_day():
+    day = to_day('2025-07-10')
+    leftovers = []
+    plans = list(plan_days([('2025-07-10', [Task(1, 'x', 1, 600, day), Task(2, 'y', 2, 600, day)])], 540, leftovers=leftovers))
+    assert [slot.task.id for slot in plans[0][1].slots] == [1]
+    assert [task.id for task in leftovers] == [2]
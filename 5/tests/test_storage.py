@@ -0,0 +1,129 @@
+import inspect
+import random
+
+import pytest
+
+from base import Database, Storage
+from storage import LogStorage, open_storage
+
+DATES = ['2026-03-%02d' % day for day in range(1, 15)]
+PRIORITIES = ["Высокий", "Средний", "Низкий"]
+RULES = ['daily', 'weekdays', 'weekly', 'monthly']
+
+
+def task_key(task):
+    return (task.id, task.name, task.rank, task.duration, task.day, task.earliest, task.deadline, task.fixed_start)
+
+
+def snapshot(db):
+    # Всё, что видят окно планировщика и CLI, через методы интерфейса Storage
+    result = []
+    for date in DATES:
+        result.append([task_key(task) for task in db.get_tasks_by_date(date)])
+        result.append(db.count_tasks_by_date(date))
+        result.append([task_key(task) for task in db.get_tasks_page(date, 1, 2)])
+    result.append([(date, [task_key(task) for task in tasks]) for date, tasks in db.iter_tasks_by_range(DATES[0], DATES[-1])])
+    result.append(db.get_day_summaries(DATES[0], DATES[-1]))
+    for text in ["task", "t1 x", "ёж", "нет", "cafe", "CAFÉ vor", "creme"]:
+        found = db.search_tasks(text, 5)
+        result.append([task_key(task) for task in found])
+        if found:
+            result.append([task_key(task) for task in db.search_tasks(text, 5, found[-1].id)])
+    return result
+
+
+def random_step(rng, step, storages):
+    first = storages[0]
+    ids = [task.id for date in DATES for task in first.get_tasks_by_date(date) if task.id > 0]
+    recurrence_ids = [recurrence['id'] for recurrence, skips in first.get_recurrences()]
+    date = rng.choice(DATES)
+    op = rng.random()
+    if op < 0.35:
+        name = rng.choice([f"task{rng.randint(0, 50)} x{rng.randint(0, 9)} ёж", "Café meeting", "Crème brûlée", "Café vorne"])
+        args = (name, rng.choice(PRIORITIES), rng.randint(5, 60), date,
+                rng.choice([None, 600]), None, None)
+        calls = [('add_task', args)]
+    elif op < 0.42:
+        batch = [{'name': f"t{rng.randint(0, 99)}", 'priority': rng.choice(PRIORITIES), 'duration': 5, 'date': rng.choice(DATES)}
+                 for _ in range(rng.randint(0, 4))]
+        calls = [('add_tasks', (batch,))]
+    elif op < 0.55 and ids:
+        task_id = rng.choice(ids)
+        calls = [('update_task', (task_id, f"upd{task_id}", rng.choice(PRIORITIES), rng.randint(5, 60), date))]
+    elif op < 0.62 and ids:
+        calls = [('move_tasks', ([(rng.choice(ids), rng.choice(DATES)) for _ in range(3)],))]
+    elif op < 0.72 and ids:
+        calls = [('delete_task', (rng.choice(ids),))]
+    elif op < 0.75 and ids:
+        calls = [('delete_tasks', (rng.sample(ids, min(3, len(ids))),))]
+    elif op < 0.77:
+        calls = [('delete_tasks_by_date', (date,))]
+    elif op < 0.82:
+        calls = [('add_recurrence', (f"rule{step}", rng.choice(PRIORITIES), 15, rng.choice(RULES), date,
+                                     rng.choice([None, DATES[-3]])))]
+    elif op < 0.86 and recurrence_ids:
+        calls = [('skip_occurrence', (rng.choice(recurrence_ids), date))]
+    elif op < 0.89 and recurrence_ids:
+        calls = [('end_recurrence', (rng.choice(recurrence_ids), date))]
+    elif op < 0.92 and recurrence_ids:
+        calls = [('update_recurrence', (rng.choice(recurrence_ids), f"ren{step}", rng.choice(PRIORITIES), 20))]
+    else:
+        calls = []
+    for name, args in calls:
+        results = [getattr(storage, name)(*args) for storage in storages]
+        assert all(result == results[0] for result in results), name
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_log_storage_matches_database(tmp_path, seed):
+    rng = random.Random(seed)
+    path = str(tmp_path / 'tasks.log')
+    database = Database(':memory:')
+    log = LogStorage(path)
+    try:
+        for step in range(600):
+            random_step(rng, step, [database, log])
+            if step % 100 == 0:
+                assert snapshot(log) == snapshot(database)
+        expected = snapshot(database)
+        assert snapshot(log) == expected
+    finally:
+        log.close()
+
+    # После повторного открытия и после сжатия журнала состояние то же
+    log = LogStorage(path)
+    try:
+        assert snapshot(log) == expected
+        log.compact()
+    finally:
+        log.close()
+    log = LogStorage(path)
+    try:
+        assert snapshot(log) == expected
+        assert log.add_task("после", "Высокий", 5, DATES[0]) == database.add_task("после", "Высокий", 5, DATES[0])
+    finally:
+        log.close()
+        database.close()
+
+
+def test_open_storage_detects_backend(tmp_path):
+    for name, expected in [('planner.db', Database), ('tasks.log', LogStorage), ('tasks.jsonl', LogStorage)]:
+        storage = open_storage(str(tmp_path / name))
+        try:
+            assert type(storage) is expected
+        finally:
+            storage.close()
+
+
+def test_storage_requires_every_method():
+    class Partial(Storage):
+        def get_tasks_by_date(self, date):
+            return []
+
+    with pytest.raises(TypeError):
+        Partial()
+
+    # Метод без реализации по умолчанию должен быть абстрактным, иначе его отсутствие заметят только при вызове
+    stubs = {name for name, method in vars(Storage).items()
+             if callable(method) and 'raise NotImplementedError' in inspect.getsource(method)}
+    assert stubs == set(Storage.__abstractmethods__)
@@ -0,0 +1,153 @@
+from collections import OrderedDict
+
+PAGE_SIZE = 100
+MAX_PAGES = 8
+# Пока в таблице нет строк, их размеры измерить нельзя
+DEFAULT_HEADER_HEIGHT = 25
+DEFAULT_ROW_HEIGHT = 20
+
+
+class VirtualTree:
+    # В ttk.Treeview создаются только видимые строки; остальные подгружаются страницами при прокрутке
+    def __init__(self, tree, scrollbar, row_id, row_values, page_size=PAGE_SIZE):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_id = row_id
+        self.row_values = row_values
+        self.page_size = page_size
+
+        self.fetch = None
+        self.total = 0
+        self.top = 0
+        self.visible = int(tree.cget('height'))
+        # Номер страницы -> строки, LRU
+        self.pages = OrderedDict()
+        # iid -> значения показанных строк
+        self.items = OrderedDict()
+        self.selected = None
+
+        scrollbar.configure(command=self.yview)
+        tree.bind('<Configure>', self.on_resize)
+        tree.bind('<<TreeviewSelect>>', self.on_select, add='+')
+        tree.bind('<MouseWheel>', lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        tree.bind('<Button-5>', lambda e: self.scroll(3))
+        tree.bind('<Prior>', lambda e: self.scroll(-self.visible))
+        tree.bind('<Next>', lambda e: self.scroll(self.visible))
+        tree.bind('<Home>', lambda e: self.scroll_to(0))
+        tree.bind('<End>', lambda e: self.scroll_to(self.total))
+        tree.bind('<Up>', lambda e: self.step(-1))
+        tree.bind('<Down>', lambda e: self.step(1))
+
+    def set_source(self, total, fetch, first_page=None, keep_position=True):
+        # fetch(offset, limit) возвращает строки; first_page - уже загруженная в фоне первая страница
+        self.total = total
+        self.fetch = fetch
+        self.pages.clear()
+        if first_page is not None:
+            self.pages[0] = first_page
+        if not keep_position:
+            self.top = 0
+            self.selected = None
+        self.top = self.clamp(self.top)
+        self.render()
+
+    def clamp(self, top):
+        return max(0, min(top, self.total - self.visible))
+
+    def page(self, number):
+        rows = self.pages.get(number)
+        if rows is None:
+            rows = self.fetch(number * self.page_size, self.page_size)
+            self.pages[number] = rows
+            while len(self.pages) > MAX_PAGES:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(number)
+        return rows
+
+    def rows(self, offset, count):
+        rows = []
+        while count > 0:
+            number, start = divmod(offset, self.page_size)
+            chunk = self.page(number)[start:start + count]
+            if not chunk:
+                break
+            rows.extend(chunk)
+            offset += len(chunk)
+            count -= len(chunk)
+        return rows
+
+    def render(self):
+        rows = self.rows(self.top, min(self.visible, self.total - self.top)) if self.fetch else []
+        items = OrderedDict((str(self.row_id(row)), tuple(self.row_values(row))) for row in rows)
+
+        for iid in [iid for iid in self.items if iid not in items]:
+            self.tree.delete(iid)
+        for index, (iid, values) in enumerate(items.items()):
+            old_values = self.items.get(iid)
+            if old_values is None:
+                self.tree.insert('', index, iid=iid, values=values)
+            else:
+                if old_values != values:
+                    self.tree.item(iid, values=values)
+                self.tree.move(iid, '', index)
+        self.items = items
+
+        # Выделение переживает прокрутку, даже если строка временно уходила из окна
+        if self.selected in items and self.tree.selection() != (self.selected,):
+            self.tree.selection_set(self.selected)
+
+        if self.total:
+            self.scrollbar.set(self.top / self.total, min(self.top + self.visible, self.total) / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_to(self, top):
+        top = self.clamp(top)
+        if top != self.top:
+            self.top = top
+            self.render()
+        return 'break'
+
+    def scroll(self, rows):
+        return self.scroll_to(self.top + rows)
+
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.scroll_to(round(float(args[1]) * self.total))
+        elif args[0] == 'scroll':
+            count = int(args[1])
+            self.scroll(count * self.visible if args[2] == 'pages' else count)
+
+    def step(self, delta):
+        # Стрелки на краю окна прокручивают список и переносят выделение на соседнюю строку
+        iids = list(self.items)
+        if not iids:
+            return 'break'
+        index = iids.index(self.selected) + delta if self.selected in iids else 0
+        if index < 0 or index >= len(iids):
+            self.scroll(delta)
+            iids = list(self.items)
+            index = max(0, min(index, len(iids) - 1))
+        self.selected = iids[index]
+        self.tree.selection_set(self.selected)
+        self.tree.focus(self.selected)
+        return 'break'
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            self.selected = selection[0]
+
+    def on_resize(self, event):
+        header, row_height = DEFAULT_HEADER_HEIGHT, DEFAULT_ROW_HEIGHT
+        if self.items:
+            box = self.tree.bbox(next(iter(self.items)))
+            if box:
+                header, row_height = box[1], box[3]
+        visible = max(1, (event.height - header) // row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.top = self.clamp(self.top)
+            self.render()
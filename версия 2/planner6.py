@@ -87,7 +87,7 @@ class BasicPlanner:
             return
         
         try:
-            datetime.strptime(date, '%Y-%m-%d')
+            date = datetime.strptime(date, '%Y-%m-%d').date().isoformat()
         except ValueError:
             messagebox.showerror("Ошибка", "Неверный формат даты. Используйте ГГГГ-ММ-ДД")
             return
@@ -138,10 +138,16 @@ class BasicPlanner:
         date_entry.insert(0, task[4])
         
         def save_changes():
+            try:
+                new_date = datetime.strptime(date_entry.get(), '%Y-%m-%d').date().isoformat()
+            except ValueError:
+                messagebox.showerror("Ошибка", "Неверный формат даты. Используйте ГГГГ-ММ-ДД")
+                return
+            
             cursor.execute("UPDATE tasks SET name=?, priority=?, duration=?, date=? WHERE id=?",
-                         (name_entry.get(), priority.get(), duration.get(), date_entry.get(), task_id))
+                         (name_entry.get(), priority.get(), duration.get(), new_date, task_id))
             self.conn.commit()
-            self.current_date = date_entry.get()
+            self.current_date = new_date
             self.date_entry.delete(0, tk.END)
             self.date_entry.insert(0, self.current_date)
             edit_window.destroy()
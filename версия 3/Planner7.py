@@ -4,6 +4,70 @@ import sqlite3
 from datetime import datetime, timedelta
 import calendar
 
+# Номер версии схемы = индекс миграции + 1, хранится в PRAGMA user_version.
+# Миграции совпадают с первыми миграциями 5/base.py: все версии планировщика
+# ведут один счётчик версий, поэтому схема каждой версии должна быть одинаковой
+MIGRATIONS = [
+    '''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        priority TEXT NOT NULL CHECK(priority IN ('Высокий', 'Средний', 'Низкий')),
+        duration INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS schedules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL UNIQUE,
+        schedule_text TEXT NOT NULL,
+        generated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    ''',
+    # Дата хранится номером дня (date.toordinal()), приоритет - рангом 1..3
+    '''
+    CREATE TABLE tasks_v2 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        priority INTEGER NOT NULL CHECK(priority IN (1, 2, 3)),
+        duration INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    -- Дата без ведущих нулей (2025-7-2) приводится к ГГГГ-ММ-ДД, приоритет принимается и со строчной буквы
+    -- (lower() в SQLite не работает с кириллицей); строки с неразборчивой датой или неизвестным
+    -- приоритетом не переносятся, а остаются в tasks_invalid для ручного исправления
+    CREATE TEMP TABLE task_values AS
+        SELECT id, CAST(julianday(printf('%04d-%02d-%02d',
+                                         substr(date, 1, instr(date, '-') - 1),
+                                         substr(rest, 1, instr(rest, '-') - 1),
+                                         substr(rest, instr(rest, '-') + 1))) - 1721424.5 AS INTEGER) AS day,
+               CASE trim(priority)
+                   WHEN 'Высокий' THEN 1 WHEN 'высокий' THEN 1
+                   WHEN 'Средний' THEN 2 WHEN 'средний' THEN 2
+                   WHEN 'Низкий' THEN 3 WHEN 'низкий' THEN 3
+               END AS rank
+        FROM (SELECT id, date, priority, substr(date, instr(date, '-') + 1) AS rest FROM tasks);
+    INSERT INTO tasks_v2 (id, name, priority, duration, day, created_at)
+        SELECT tasks.id, name, task_values.rank, duration, task_values.day, created_at
+        FROM tasks JOIN task_values ON task_values.id = tasks.id
+        WHERE task_values.day IS NOT NULL AND task_values.rank IS NOT NULL;
+    CREATE TABLE tasks_invalid AS
+        SELECT tasks.* FROM tasks JOIN task_values ON task_values.id = tasks.id
+        WHERE task_values.day IS NULL OR task_values.rank IS NULL;
+    DROP TABLE task_values;
+    UPDATE sqlite_sequence SET seq = (SELECT MAX(seq) FROM sqlite_sequence WHERE name IN ('tasks', 'tasks_v2'))
+        WHERE name = 'tasks_v2';
+    DROP TABLE tasks;
+    ALTER TABLE tasks_v2 RENAME TO tasks;
+    CREATE INDEX idx_tasks_day_priority ON tasks (day, priority);
+    ''',
+]
+
+TASK_COLUMNS = "id, name, CASE priority WHEN 1 THEN 'Высокий' WHEN 2 THEN 'Средний' ELSE 'Низкий' END, duration, date(day + 1721424.5)"
+DAY_PARAM = "CAST(julianday(?) - 1721424.5 AS INTEGER)"
+PRIORITY_PARAM = "CASE ? WHEN 'Высокий' THEN 1 WHEN 'Средний' THEN 2 ELSE 3 END"
+
 class IntermediatePlanner:
     def __init__(self, root):
         self.root = root
@@ -18,16 +82,18 @@ class IntermediatePlanner:
 
     def create_table(self):
         cursor = self.conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                priority TEXT NOT NULL,
-                duration INTEGER NOT NULL,
-                date TEXT NOT NULL
-            )
-        ''')
-        self.conn.commit()
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        # Таблица, созданная прежними версиями программы, могла остаться без created_at
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(tasks)")]
+        if columns and 'created_at' not in columns:
+            cursor.execute("ALTER TABLE tasks ADD COLUMN created_at TEXT")
+            self.conn.commit()
+        for version, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            try:
+                cursor.executescript(f"BEGIN; {script} PRAGMA user_version = {version}; COMMIT;")
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
 
     def create_widgets(self):
         header_frame = ttk.Frame(self.root)
@@ -57,7 +123,7 @@ class IntermediatePlanner:
         self.task_entry.grid(row=0, column=1, padx=5)
         
         ttk.Label(input_frame, text="Приоритет:").grid(row=1, column=0, sticky='e')
-        self.priority = ttk.Combobox(input_frame, values=["Высокий", "Средний", "Низкий"], width=37)
+        self.priority = ttk.Combobox(input_frame, values=["Высокий", "Средний", "Низкий"], state="readonly", width=37)
         self.priority.grid(row=1, column=1, padx=5)
         self.priority.current(1)
         
@@ -99,7 +165,7 @@ class IntermediatePlanner:
     def load_tasks(self):
         self.tree.delete(*self.tree.get_children())
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE date=?", (self.current_date,))
+        cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE day={DAY_PARAM}", (self.current_date,))
         for task in cursor.fetchall():
             self.tree.insert('', 'end', values=task)
 
@@ -114,7 +180,7 @@ class IntermediatePlanner:
             return
         
         try:
-            datetime.strptime(date, '%Y-%m-%d')
+            date = datetime.strptime(date, '%Y-%m-%d').date().isoformat()
         except ValueError:
             messagebox.showerror("Ошибка", "Неверный формат даты. Используйте ГГГГ-ММ-ДД")
             return
@@ -128,13 +194,13 @@ class IntermediatePlanner:
             return
         
         cursor = self.conn.cursor()
-        cursor.execute("SELECT SUM(duration) FROM tasks WHERE date=?", (date,))
+        cursor.execute(f"SELECT SUM(duration) FROM tasks WHERE day={DAY_PARAM}", (date,))
         total = cursor.fetchone()[0] or 0
         if (total + duration) > 1440:  # 24 часа = 1440 минут
             messagebox.showwarning("Ошибка", "Общая длительность задач не может превышать 24 часа (1440 минут)")
             return
         
-        cursor.execute("INSERT INTO tasks (name, priority, duration, date) VALUES (?, ?, ?, ?)",
+        cursor.execute(f"INSERT INTO tasks (name, priority, duration, day) VALUES (?, {PRIORITY_PARAM}, ?, {DAY_PARAM})",
                       (name, priority, duration, date))
         self.conn.commit()
         
@@ -152,7 +218,7 @@ class IntermediatePlanner:
         task_id = self.tree.item(selected[0])['values'][0]
         
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE id=?", (task_id,))
+        cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE id=?", (task_id,))
         task = cursor.fetchone()
         
         edit_window = tk.Toplevel(self.root)
@@ -165,7 +231,7 @@ class IntermediatePlanner:
         name_entry.insert(0, task[1])
         
         ttk.Label(edit_window, text="Приоритет:").grid(row=1, column=0, padx=5, pady=5, sticky='e')
-        priority = ttk.Combobox(edit_window, values=["Высокий", "Средний", "Низкий"], width=27)
+        priority = ttk.Combobox(edit_window, values=["Высокий", "Средний", "Низкий"], state="readonly", width=27)
         priority.grid(row=1, column=1, padx=5, pady=5)
         priority.set(task[2])
         
@@ -188,16 +254,22 @@ class IntermediatePlanner:
                 messagebox.showerror("Ошибка", "Длительность должна быть положительным числом")
                 return
             
-            cursor.execute("SELECT SUM(duration) FROM tasks WHERE date=? AND id!=?", (date_entry.get(), task_id))
+            try:
+                new_date = datetime.strptime(date_entry.get(), '%Y-%m-%d').date().isoformat()
+            except ValueError:
+                messagebox.showerror("Ошибка", "Неверный формат даты. Используйте ГГГГ-ММ-ДД")
+                return
+            
+            cursor.execute(f"SELECT SUM(duration) FROM tasks WHERE day={DAY_PARAM} AND id!=?", (new_date, task_id))
             total = cursor.fetchone()[0] or 0
             if (total + new_duration) > 1440:
                 messagebox.showwarning("Ошибка", "Общая длительность задач не может превышать 24 часа (1440 минут)")
                 return
             
-            cursor.execute("UPDATE tasks SET name=?, priority=?, duration=?, date=? WHERE id=?",
-                         (name_entry.get(), priority.get(), new_duration, date_entry.get(), task_id))
+            cursor.execute(f"UPDATE tasks SET name=?, priority={PRIORITY_PARAM}, duration=?, day={DAY_PARAM} WHERE id=?",
+                         (name_entry.get(), priority.get(), new_duration, new_date, task_id))
             self.conn.commit()
-            self.current_date = date_entry.get()
+            self.current_date = new_date
             self.date_entry.delete(0, tk.END)
             self.date_entry.insert(0, self.current_date)
             edit_window.destroy()
@@ -229,13 +301,13 @@ class IntermediatePlanner:
     def clear_all(self):
         if messagebox.askyesno("Подтверждение", "Удалить ВСЕ задачи на выбранную дату?"):
             cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM tasks WHERE date=?", (self.current_date,))
+            cursor.execute(f"DELETE FROM tasks WHERE day={DAY_PARAM}", (self.current_date,))
             self.conn.commit()
             self.load_tasks()
 
     def generate_schedule(self):
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE date=? ORDER BY CASE priority WHEN 'Высокий' THEN 1 WHEN 'Средний' THEN 2 ELSE 3 END", 
+        cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE day={DAY_PARAM} ORDER BY priority", 
                       (self.current_date,))
         tasks = cursor.fetchall()
         
@@ -317,7 +389,7 @@ class IntermediatePlanner:
         schedule_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE date=? ORDER BY CASE priority WHEN 'Высокий' THEN 1 WHEN 'Средний' THEN 2 ELSE 3 END", 
+        cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE day={DAY_PARAM} ORDER BY priority", 
                       (date_str,))
         tasks = cursor.fetchall()
         
@@ -406,6 +478,12 @@ class IntermediatePlanner:
                      row=0, column=col, sticky="nsew", padx=1, pady=1)
 
         month_calendar = calendar.monthcalendar(year, month)
+        days_in_month = calendar.monthrange(year, month)[1]
+        
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT date(day + 1721424.5), COUNT(*) FROM tasks WHERE day BETWEEN {DAY_PARAM} AND {DAY_PARAM} GROUP BY day",
+                      (f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-{days_in_month:02d}"))
+        task_counts = dict(cursor.fetchall())
         
         for week_num, week in enumerate(month_calendar, start=1):
             ttk.Label(self.calendar_frame, text=str(week_num), borderwidth=1, relief="solid",
@@ -417,9 +495,7 @@ class IntermediatePlanner:
                     continue
                     
                 date_str = f"{year:04d}-{month:02d}-{day:02d}"
-                cursor = self.conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM tasks WHERE date=?", (date_str,))
-                has_tasks = cursor.fetchone()[0] > 0
+                has_tasks = task_counts.get(date_str, 0) > 0
                 
                 bg_color = "#ffffcc" if has_tasks else "#ffffff"
                 
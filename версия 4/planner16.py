@@ -3,9 +3,79 @@ from tkinter import ttk, messagebox
 import sqlite3
 from datetime import datetime, timedelta
 import calendar
-import winsound
 import threading
 import time
+import queue
+import sys
+try:
+    import winsound
+except ImportError:
+    # На Linux winsound нет - работаем без звука
+    winsound = None
+
+# Номер версии схемы = индекс миграции + 1, хранится в PRAGMA user_version.
+# Миграции совпадают с первыми миграциями 5/base.py: все версии планировщика
+# ведут один счётчик версий, поэтому схема каждой версии должна быть одинаковой
+MIGRATIONS = [
+    '''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        priority TEXT NOT NULL CHECK(priority IN ('Высокий', 'Средний', 'Низкий')),
+        duration INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS schedules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL UNIQUE,
+        schedule_text TEXT NOT NULL,
+        generated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    ''',
+    # Дата хранится номером дня (date.toordinal()), приоритет - рангом 1..3
+    '''
+    CREATE TABLE tasks_v2 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        priority INTEGER NOT NULL CHECK(priority IN (1, 2, 3)),
+        duration INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    -- Дата без ведущих нулей (2025-7-2) приводится к ГГГГ-ММ-ДД, приоритет принимается и со строчной буквы
+    -- (lower() в SQLite не работает с кириллицей); строки с неразборчивой датой или неизвестным
+    -- приоритетом не переносятся, а остаются в tasks_invalid для ручного исправления
+    CREATE TEMP TABLE task_values AS
+        SELECT id, CAST(julianday(printf('%04d-%02d-%02d',
+                                         substr(date, 1, instr(date, '-') - 1),
+                                         substr(rest, 1, instr(rest, '-') - 1),
+                                         substr(rest, instr(rest, '-') + 1))) - 1721424.5 AS INTEGER) AS day,
+               CASE trim(priority)
+                   WHEN 'Высокий' THEN 1 WHEN 'высокий' THEN 1
+                   WHEN 'Средний' THEN 2 WHEN 'средний' THEN 2
+                   WHEN 'Низкий' THEN 3 WHEN 'низкий' THEN 3
+               END AS rank
+        FROM (SELECT id, date, priority, substr(date, instr(date, '-') + 1) AS rest FROM tasks);
+    INSERT INTO tasks_v2 (id, name, priority, duration, day, created_at)
+        SELECT tasks.id, name, task_values.rank, duration, task_values.day, created_at
+        FROM tasks JOIN task_values ON task_values.id = tasks.id
+        WHERE task_values.day IS NOT NULL AND task_values.rank IS NOT NULL;
+    CREATE TABLE tasks_invalid AS
+        SELECT tasks.* FROM tasks JOIN task_values ON task_values.id = tasks.id
+        WHERE task_values.day IS NULL OR task_values.rank IS NULL;
+    DROP TABLE task_values;
+    UPDATE sqlite_sequence SET seq = (SELECT MAX(seq) FROM sqlite_sequence WHERE name IN ('tasks', 'tasks_v2'))
+        WHERE name = 'tasks_v2';
+    DROP TABLE tasks;
+    ALTER TABLE tasks_v2 RENAME TO tasks;
+    CREATE INDEX idx_tasks_day_priority ON tasks (day, priority);
+    ''',
+]
+
+TASK_COLUMNS = "id, name, CASE priority WHEN 1 THEN 'Высокий' WHEN 2 THEN 'Средний' ELSE 'Низкий' END, duration, date(day + 1721424.5)"
+DAY_PARAM = "CAST(julianday(?) - 1721424.5 AS INTEGER)"
+PRIORITY_PARAM = "CASE ? WHEN 'Высокий' THEN 1 WHEN 'Средний' THEN 2 ELSE 3 END"
 
 class AdvancedPlanner:
     def __init__(self, root):
@@ -14,17 +84,22 @@ class AdvancedPlanner:
         self.root.geometry("1000x600")
         self.setup_style()
         
-        self.conn = sqlite3.connect('planner.db')
+        self.db_name = 'planner.db'
+        self.local = threading.local()
+        self.connections = []
+        self.connections_lock = threading.Lock()
         self.create_table()
         self.current_date = datetime.now().strftime('%Y-%m-%d')
         self.start_time = "09:00"
         self.notification_sound = True
         self.active_notification = None
-        self.sound_thread = None
-        self.sound_flag = False
+        self.sound_stop = threading.Event()
+        # События из фоновых потоков; обрабатываются только в основном цикле Tk
+        self.ui_events = queue.Queue(maxsize=256)
         
         self.create_widgets()
         self.load_tasks()
+        self.root.after(50, self.drain_ui_events)
         
         self.notification_thread = threading.Thread(target=self.check_notifications, daemon=True)
         self.notification_thread.start()
@@ -44,11 +119,34 @@ class AdvancedPlanner:
             "Низкий": "#ccffcc"
         }
     
+    @property
+    def conn(self):
+        # Поток уведомлений работает со своим соединением, а не с соединением Tk-потока
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_name, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            with self.connections_lock:
+                self.connections.append(conn)
+        return conn
+    
     def create_table(self):
         cursor = self.conn.cursor()
-        cursor.execute 
-        self.conn.commit()
-    
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        # Таблица, созданная прежними версиями программы, могла остаться без created_at
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(tasks)")]
+        if columns and 'created_at' not in columns:
+            cursor.execute("ALTER TABLE tasks ADD COLUMN created_at TEXT")
+            self.conn.commit()
+        for version, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            try:
+                cursor.executescript(f"BEGIN; {script} PRAGMA user_version = {version}; COMMIT;")
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+
     def create_widgets(self):
         header_frame = ttk.Frame(self.root)
         header_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -78,6 +176,7 @@ class AdvancedPlanner:
         self.start_time_entry = ttk.Entry(date_frame, width=5)
         self.start_time_entry.pack(side=tk.LEFT, padx=5)
         self.start_time_entry.insert(0, self.start_time)
+        self.start_time_entry.bind("<FocusOut>", lambda e: self.validate_start_time())
         
         self.sound_btn = ttk.Button(date_frame, text="🔔 Звук Вкл", command=self.toggle_sound)
         self.sound_btn.pack(side=tk.RIGHT, padx=5)
@@ -136,7 +235,7 @@ class AdvancedPlanner:
     def load_tasks(self):
         self.tree.delete(*self.tree.get_children())
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE date=?", (self.current_date,))
+        cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE day={DAY_PARAM}", (self.current_date,))
         for task in cursor.fetchall():
             self.tree.insert('', 'end', values=task)
     
@@ -151,7 +250,7 @@ class AdvancedPlanner:
             return
         
         try:
-            datetime.strptime(date, '%Y-%m-%d')
+            date = datetime.strptime(date, '%Y-%m-%d').date().isoformat()
         except ValueError:
             messagebox.showerror("Ошибка", "Неверный формат даты. Используйте ГГГГ-ММ-ДД")
             return
@@ -165,7 +264,7 @@ class AdvancedPlanner:
             return
         
         cursor = self.conn.cursor()
-        cursor.execute("SELECT SUM(duration) FROM tasks WHERE date=?", (date,))
+        cursor.execute(f"SELECT SUM(duration) FROM tasks WHERE day={DAY_PARAM}", (date,))
         total = cursor.fetchone()[0] or 0
         if (total + duration) > 1440:
             messagebox.showwarning("Ошибка", "Общая длительность задач не может превышать 24 часа (1440 минут)")
@@ -176,7 +275,7 @@ class AdvancedPlanner:
         except ValueError:
             start_time = datetime.strptime("09:00", "%H:%M")
         
-        cursor.execute("SELECT duration FROM tasks WHERE date=?", (date,))
+        cursor.execute(f"SELECT duration FROM tasks WHERE day={DAY_PARAM}", (date,))
         tasks_durations = [d[0] for d in cursor.fetchall()]
         
         total_minutes = (start_time.hour * 60 + start_time.minute) + sum(tasks_durations) + duration + (len(tasks_durations) * 10)
@@ -184,7 +283,7 @@ class AdvancedPlanner:
             messagebox.showwarning("Ошибка", "Расписание выходит за пределы дня (после 23:59)")
             return
         
-        cursor.execute("INSERT INTO tasks (name, priority, duration, date) VALUES (?, ?, ?, ?)",
+        cursor.execute(f"INSERT INTO tasks (name, priority, duration, day) VALUES (?, {PRIORITY_PARAM}, ?, {DAY_PARAM})",
                       (name, priority, duration, date))
         self.conn.commit()
         
@@ -204,7 +303,7 @@ class AdvancedPlanner:
         task_id = self.tree.item(selected[0])['values'][0]
         
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE id=?", (task_id,))
+        cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE id=?", (task_id,))
         task = cursor.fetchone()
         
         edit_window = tk.Toplevel(self.root)
@@ -246,7 +345,13 @@ class AdvancedPlanner:
                 messagebox.showerror("Ошибка", "Длительность должна быть положительным числом")
                 return
             
-            cursor.execute("SELECT SUM(duration) FROM tasks WHERE date=? AND id!=?", (date_entry.get(), task_id))
+            try:
+                new_date = datetime.strptime(date_entry.get(), '%Y-%m-%d').date().isoformat()
+            except ValueError:
+                messagebox.showerror("Ошибка", "Неверный формат даты. Используйте ГГГГ-ММ-ДД")
+                return
+            
+            cursor.execute(f"SELECT SUM(duration) FROM tasks WHERE day={DAY_PARAM} AND id!=?", (new_date, task_id))
             total = cursor.fetchone()[0] or 0
             if (total + new_duration) > 1440:
                 messagebox.showwarning("Ошибка", "Общая длительность задач не может превышать 24 часа (1440 минут)")
@@ -257,7 +362,7 @@ class AdvancedPlanner:
             except ValueError:
                 start_time = datetime.strptime("09:00", "%H:%M")
             
-            cursor.execute("SELECT duration FROM tasks WHERE date=? AND id!=?", (date_entry.get(), task_id))
+            cursor.execute(f"SELECT duration FROM tasks WHERE day={DAY_PARAM} AND id!=?", (new_date, task_id))
             tasks_durations = [d[0] for d in cursor.fetchall()]
             
             total_minutes = (start_time.hour * 60 + start_time.minute) + sum(tasks_durations) + new_duration + (len(tasks_durations) )* 10
@@ -265,10 +370,10 @@ class AdvancedPlanner:
                 messagebox.showwarning("Ошибка", "Расписание выходит за пределы дня (после 23:59)")
                 return
             
-            cursor.execute("UPDATE tasks SET name=?, priority=?, duration=?, date=? WHERE id=?",
-                         (name_entry.get(), priority_var.get(), new_duration, date_entry.get(), task_id))
+            cursor.execute(f"UPDATE tasks SET name=?, priority={PRIORITY_PARAM}, duration=?, day={DAY_PARAM} WHERE id=?",
+                         (name_entry.get(), priority_var.get(), new_duration, new_date, task_id))
             self.conn.commit()
-            self.current_date = date_entry.get()
+            self.current_date = new_date
             self.date_entry.delete(0, tk.END)
             self.date_entry.insert(0, self.current_date)
             edit_window.destroy()
@@ -311,7 +416,7 @@ class AdvancedPlanner:
     def clear_all(self):
         if messagebox.askyesno("Подтверждение", "Удалить ВСЕ задачи на выбранную дату?"):
             cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM tasks WHERE date=?", (self.current_date,))
+            cursor.execute(f"DELETE FROM tasks WHERE day={DAY_PARAM}", (self.current_date,))
             self.conn.commit()
             self.load_tasks()
             self.play_notification_sound()
@@ -319,7 +424,7 @@ class AdvancedPlanner:
     
     def generate_schedule(self):
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE date=? ORDER BY CASE priority WHEN 'Высокий' THEN 1 WHEN 'Средний' THEN 2 ELSE 3 END", 
+        cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE day={DAY_PARAM} ORDER BY priority", 
                       (self.current_date,))
         tasks = cursor.fetchall()
         
@@ -408,7 +513,7 @@ class AdvancedPlanner:
         schedule_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE date=? ORDER BY CASE priority WHEN 'Высокий' THEN 1 WHEN 'Средний' THEN 2 ELSE 3 END", 
+        cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE day={DAY_PARAM} ORDER BY priority", 
                       (date_str,))
         tasks = cursor.fetchall()
         
@@ -509,7 +614,7 @@ class AdvancedPlanner:
                     
                 date_str = f"{year:04d}-{month:02d}-{day:02d}"
                 cursor = self.conn.cursor()
-                cursor.execute("SELECT * FROM tasks WHERE date=?", (date_str,))
+                cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE day={DAY_PARAM}", (date_str,))
                 tasks = cursor.fetchall()
                 has_tasks = len(tasks) > 0
                 
@@ -598,19 +703,17 @@ class AdvancedPlanner:
             self.sound_btn.config(text="🔕 Звук Выкл")
             self.stop_sound()
     
-    def play_continuous_sound(self):
-        self.sound_flag = True
-        while self.sound_flag and self.notification_sound:
+    def play_continuous_sound(self, stop):
+        while not stop.is_set() and self.notification_sound:
             try:
                 winsound.Beep(1000, 500)
-                time.sleep(0.5)
             except:
                 break
+            stop.wait(0.5)
     
     def stop_sound(self):
-        self.sound_flag = False
-        if self.sound_thread and self.sound_thread.is_alive():
-            self.sound_thread.join()
+        # Поток не ждём: он завершится сам после текущего сигнала
+        self.sound_stop.set()
     
     def show_notification(self, title, message):
         if self.active_notification:
@@ -631,9 +734,9 @@ class AdvancedPlanner:
         
         self.active_notification = notification
         
-        if self.notification_sound:
-            self.sound_thread = threading.Thread(target=self.play_continuous_sound, daemon=True)
-            self.sound_thread.start()
+        if self.notification_sound and winsound is not None:
+            self.sound_stop = threading.Event()
+            threading.Thread(target=self.play_continuous_sound, args=(self.sound_stop,), daemon=True).start()
     
     def close_notification(self, notification):
         self.stop_sound()
@@ -648,12 +751,12 @@ class AdvancedPlanner:
             current_date = now.strftime("%Y-%m-%d")
             
             cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM tasks WHERE date=?", (current_date,))
+            cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE day={DAY_PARAM}", (current_date,))
             tasks = cursor.fetchall()
             
             if tasks:
                 try:
-                    start_time = datetime.strptime(self.start_time_entry.get(), "%H:%M")
+                    start_time = datetime.strptime(self.start_time, "%H:%M")
                 except ValueError:
                     start_time = datetime.strptime("09:00", "%H:%M")
                 
@@ -670,14 +773,18 @@ class AdvancedPlanner:
                     task_start_minutes = task_start.hour * 60 + task_start.minute
                     
                     if current_total_minutes == reminder_minutes:
-                        self.show_notification(
+                        self.post_ui_event(
+                            ('notification', task[0]),
+                            self.show_notification,
                             "Напоминание", 
                             f"Через 5 минут начинается задача: {task[1]}\n"
                             f"Время: {task_start.strftime('%H:%M')} - {task_end.strftime('%H:%M')}\n"
                             f"Приоритет: {task[2]}"
                         )
                     elif current_total_minutes == task_start_minutes:
-                        self.show_notification(
+                        self.post_ui_event(
+                            ('notification', task[0]),
+                            self.show_notification,
                             "Начало задачи", 
                             f"Сейчас начинается задача: {task[1]}\n"
                             f"Время: {task_start.strftime('%H:%M')} - {task_end.strftime('%H:%M')}\n"
@@ -688,15 +795,51 @@ class AdvancedPlanner:
             
             time.sleep(30) 
     
-    def play_notification_sound(self):
-        if self.notification_sound:
+    def post_ui_event(self, key, callback, *args):
+        # Вызывается из любого потока; при переполнении очереди событие отбрасывается
+        try:
+            self.ui_events.put_nowait((key, callback, args))
+        except queue.Full:
+            pass
+    
+    def validate_start_time(self):
+        # Поток уведомлений не обращается к виджетам и читает уже проверенное self.start_time
+        time_str = self.start_time_entry.get()
+        try:
+            datetime.strptime(time_str, '%H:%M')
+            self.start_time = time_str
+        except ValueError:
+            messagebox.showerror("Ошибка", "Неверный формат времени. Используйте ЧЧ:ММ")
+            self.start_time_entry.delete(0, tk.END)
+            self.start_time_entry.insert(0, self.start_time)
+    
+    def drain_ui_events(self):
+        self.root.after(50, self.drain_ui_events)
+        events = {}
+        while True:
             try:
-                winsound.Beep(1000, 200)
-            except:
-                pass
+                key, callback, args = self.ui_events.get_nowait()
+            except queue.Empty:
+                break
+            # Из нескольких событий по одной задаче остаётся последнее
+            events.pop(key, None)
+            events[key] = (callback, args)
+        
+        for callback, args in events.values():
+            try:
+                callback(*args)
+            except Exception:
+                # Ошибка одного события не должна терять остальные
+                self.root.report_callback_exception(*sys.exc_info())
+    
+    def play_notification_sound(self):
+        if self.notification_sound and winsound is not None:
+            threading.Thread(target=winsound.Beep, args=(1000, 200), daemon=True).start()
     
     def __del__(self):
-        self.conn.close()
+        with self.connections_lock:
+            for conn in self.connections:
+                conn.close()
 
 if __name__ == "__main__":
     root = tk.Tk()
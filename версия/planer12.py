@@ -3,6 +3,70 @@ from tkinter import ttk, messagebox
 import sqlite3
 from datetime import datetime
 
+# Номер версии схемы = индекс миграции + 1, хранится в PRAGMA user_version.
+# Миграции совпадают с первыми миграциями 5/base.py: все версии планировщика
+# ведут один счётчик версий, поэтому схема каждой версии должна быть одинаковой
+MIGRATIONS = [
+    '''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        priority TEXT NOT NULL CHECK(priority IN ('Высокий', 'Средний', 'Низкий')),
+        duration INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS schedules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL UNIQUE,
+        schedule_text TEXT NOT NULL,
+        generated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    ''',
+    # Дата хранится номером дня (date.toordinal()), приоритет - рангом 1..3
+    '''
+    CREATE TABLE tasks_v2 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        priority INTEGER NOT NULL CHECK(priority IN (1, 2, 3)),
+        duration INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    -- Дата без ведущих нулей (2025-7-2) приводится к ГГГГ-ММ-ДД, приоритет принимается и со строчной буквы
+    -- (lower() в SQLite не работает с кириллицей); строки с неразборчивой датой или неизвестным
+    -- приоритетом не переносятся, а остаются в tasks_invalid для ручного исправления
+    CREATE TEMP TABLE task_values AS
+        SELECT id, CAST(julianday(printf('%04d-%02d-%02d',
+                                         substr(date, 1, instr(date, '-') - 1),
+                                         substr(rest, 1, instr(rest, '-') - 1),
+                                         substr(rest, instr(rest, '-') + 1))) - 1721424.5 AS INTEGER) AS day,
+               CASE trim(priority)
+                   WHEN 'Высокий' THEN 1 WHEN 'высокий' THEN 1
+                   WHEN 'Средний' THEN 2 WHEN 'средний' THEN 2
+                   WHEN 'Низкий' THEN 3 WHEN 'низкий' THEN 3
+               END AS rank
+        FROM (SELECT id, date, priority, substr(date, instr(date, '-') + 1) AS rest FROM tasks);
+    INSERT INTO tasks_v2 (id, name, priority, duration, day, created_at)
+        SELECT tasks.id, name, task_values.rank, duration, task_values.day, created_at
+        FROM tasks JOIN task_values ON task_values.id = tasks.id
+        WHERE task_values.day IS NOT NULL AND task_values.rank IS NOT NULL;
+    CREATE TABLE tasks_invalid AS
+        SELECT tasks.* FROM tasks JOIN task_values ON task_values.id = tasks.id
+        WHERE task_values.day IS NULL OR task_values.rank IS NULL;
+    DROP TABLE task_values;
+    UPDATE sqlite_sequence SET seq = (SELECT MAX(seq) FROM sqlite_sequence WHERE name IN ('tasks', 'tasks_v2'))
+        WHERE name = 'tasks_v2';
+    DROP TABLE tasks;
+    ALTER TABLE tasks_v2 RENAME TO tasks;
+    CREATE INDEX idx_tasks_day_priority ON tasks (day, priority);
+    ''',
+]
+
+TASK_COLUMNS = "id, name, CASE priority WHEN 1 THEN 'Высокий' WHEN 2 THEN 'Средний' ELSE 'Низкий' END, duration, date(day + 1721424.5)"
+DAY_PARAM = "CAST(julianday(?) - 1721424.5 AS INTEGER)"
+PRIORITY_PARAM = "CASE ? WHEN 'Высокий' THEN 1 WHEN 'Средний' THEN 2 ELSE 3 END"
+
 class SimplePlanner:
     def __init__(self, root):
         self.root = root
@@ -16,16 +80,18 @@ class SimplePlanner:
 
     def create_table(self):
         cursor = self.conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                priority TEXT NOT NULL,
-                duration INTEGER NOT NULL,
-                date TEXT NOT NULL
-            )
-        ''')
-        self.conn.commit()
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        # Таблица, созданная прежними версиями программы, могла остаться без created_at
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(tasks)")]
+        if columns and 'created_at' not in columns:
+            cursor.execute("ALTER TABLE tasks ADD COLUMN created_at TEXT")
+            self.conn.commit()
+        for version, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            try:
+                cursor.executescript(f"BEGIN; {script} PRAGMA user_version = {version}; COMMIT;")
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
 
     def create_widgets(self):
         input_frame = ttk.Frame(self.root)
@@ -36,7 +102,7 @@ class SimplePlanner:
         self.task_entry.grid(row=0, column=1)
         
         ttk.Label(input_frame, text="Приоритет:").grid(row=1, column=0)
-        self.priority = ttk.Combobox(input_frame, values=["Высокий", "Средний", "Низкий"])
+        self.priority = ttk.Combobox(input_frame, values=["Высокий", "Средний", "Низкий"], state="readonly")
         self.priority.grid(row=1, column=1)
         self.priority.current(1)
         
@@ -62,7 +128,7 @@ class SimplePlanner:
     def load_tasks(self):
         self.tree.delete(*self.tree.get_children())
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE date=?", (self.current_date,))
+        cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE day={DAY_PARAM}", (self.current_date,))
         for task in cursor.fetchall():
             self.tree.insert('', 'end', values=task)
 
@@ -76,7 +142,7 @@ class SimplePlanner:
             return
         
         cursor = self.conn.cursor()
-        cursor.execute("INSERT INTO tasks (name, priority, duration, date) VALUES (?, ?, ?, ?)",
+        cursor.execute(f"INSERT INTO tasks (name, priority, duration, day) VALUES (?, {PRIORITY_PARAM}, ?, {DAY_PARAM})",
                       (name, priority, duration, self.current_date))
         self.conn.commit()
         
@@ -93,7 +159,7 @@ class SimplePlanner:
         task_id = self.tree.item(selected[0])['values'][0]
         
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE id=?", (task_id,))
+        cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE id=?", (task_id,))
         task = cursor.fetchone()
         
         edit_window = tk.Toplevel(self.root)
@@ -105,7 +171,7 @@ class SimplePlanner:
         name_entry.insert(0, task[1])
         
         ttk.Label(edit_window, text="Приоритет:").grid(row=1, column=0)
-        priority = ttk.Combobox(edit_window, values=["Высокий", "Средний", "Низкий"])
+        priority = ttk.Combobox(edit_window, values=["Высокий", "Средний", "Низкий"], state="readonly")
         priority.grid(row=1, column=1)
         priority.set(task[2])
         
@@ -115,7 +181,7 @@ class SimplePlanner:
         duration.insert(0, task[3])
         
         def save_changes():
-            cursor.execute("UPDATE tasks SET name=?, priority=?, duration=? WHERE id=?",
+            cursor.execute(f"UPDATE tasks SET name=?, priority={PRIORITY_PARAM}, duration=? WHERE id=?",
                          (name_entry.get(), priority.get(), duration.get(), task_id))
             self.conn.commit()
             edit_window.destroy()
@@ -139,7 +205,7 @@ class SimplePlanner:
     def clear_all(self):
         if messagebox.askyesno("Подтверждение", "Удалить ВСЕ задачи?"):
             cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM tasks WHERE date=?", (self.current_date,))
+            cursor.execute(f"DELETE FROM tasks WHERE day={DAY_PARAM}", (self.current_date,))
             self.conn.commit()
             self.load_tasks()
 